@@ -0,0 +1,125 @@
+"""
+Benchmark decoding huge static sources into a sticker canvas.
+
+Usage: python benchmarks/bench_decode.py [image ...] [--repeat N]
+
+Compares the old path (full size decode, convert to RGBA, one LANCZOS resize)
+with decode_static_image (scaled JPEG decoding, Image.reduce through
+reducing_gap, no full size RGBA copy). Each run happens in a fresh process so
+its peak RSS can be measured. Without arguments a 6000x4000 JPEG and a
+7680x4320 PNG are generated in a temporary folder first.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = PROJECT_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from arc9_sticker_pack_maker import core
+from arc9_sticker_pack_maker.core import Image, np
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def peak_rss_mib():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def make_sources(folder):
+    rng = np.random.default_rng(0)
+    paths = []
+    for name, (width, height) in (("photo_6000x4000.jpg", (6000, 4000)), ("render_7680x4320.png", (7680, 4320))):
+        # Smooth gradients with some noise so the encoders have realistic work to do.
+        x = np.linspace(0, 255, width, dtype=np.float32)
+        y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+        pixels = np.empty((height, width, 3), dtype=np.int16)
+        pixels[..., 0] = x
+        pixels[..., 1] = y
+        pixels[..., 2] = (x + y) / 2
+        # Add the noise in a wider type, uint8 would wrap bright texels around to black.
+        pixels += rng.integers(0, 16, size=(height, width, 1), dtype=np.int16)
+        image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+        path = os.path.join(folder, name)
+        if name.endswith(".jpg"):
+            image.save(path, quality=90)
+        else:
+            image.save(path)
+        paths.append(path)
+    return paths
+
+
+def run_once(path, fast, result_queue):
+    letterbox = {"max_size": core.STICKER_MAX_SIZE}
+    baseline = peak_rss_mib()
+    start = time.perf_counter()
+    with Image.open(path) as img:
+        megapixels = img.width * img.height / 1e6
+        if fast:
+            canvas = core.letterbox_image(core.decode_static_image(img, letterbox), **letterbox)
+        else:
+            core.REDUCING_GAP = None
+            canvas = core.letterbox_image(img.convert("RGBA"), **letterbox)
+    elapsed = time.perf_counter() - start
+    peak = peak_rss_mib()
+    result_queue.put((elapsed, megapixels, None if peak is None else peak - baseline, np.asarray(canvas)))
+
+
+def measure(path, fast, repeat):
+    """Best time and peak RSS growth over repeat fresh processes, plus the canvas."""
+    context = multiprocessing.get_context("spawn")
+    runs = []
+    for _ in range(repeat):
+        result_queue = context.Queue()
+        process = context.Process(target=run_once, args=(path, fast, result_queue))
+        process.start()
+        runs.append(result_queue.get())
+        process.join()
+    elapsed = min(run[0] for run in runs)
+    peaks = [run[2] for run in runs if run[2] is not None]
+    return elapsed, runs[0][1], max(peaks) if peaks else None, runs[0][3]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("images", nargs="*")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        if args.images:
+            paths = args.images
+        else:
+            # Generate in a child, Linux hands the peak RSS of a parent down to the processes it starts.
+            with multiprocessing.get_context("spawn").Pool(1) as pool:
+                paths = pool.apply(make_sources, (folder,))
+        print(f"{'image':<28} {'path':<6} {'MP':>6} {'ms':>8} {'ms/MP':>7} {'peak MiB':>9} {'rmse':>6}")
+        for path in paths:
+            name = os.path.basename(path)[:28]
+            reference = None
+            for label, fast in (("before", False), ("after", True)):
+                elapsed, megapixels, peak, canvas = measure(path, fast, args.repeat)
+                if reference is None:
+                    reference = canvas.astype(np.float64)
+                rmse = float(np.sqrt(((canvas - reference) ** 2).mean()))
+                peak_text = "n/a" if peak is None else f"{peak:.0f}"
+                print(f"{name:<28} {label:<6} {megapixels:>6.1f} {elapsed * 1000:>8.0f} "
+                      f"{elapsed * 1000 / megapixels:>7.1f} {peak_text:>9} {rmse:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
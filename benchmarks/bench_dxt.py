@@ -0,0 +1,113 @@
+"""
+Benchmark the NumPy DXT5 compressor against VTFLib's DXT5 output.
+
+Usage: python benchmarks/bench_dxt.py [image folder] [--repeat N]
+
+Every image is letterboxed to 512x512 like a static sticker, then compressed
+by both encoders. RMSE is measured on the decoded RGB of visible pixels and on
+alpha. VTFLib is skipped when its binaries cannot be loaded (e.g. on Linux).
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = PROJECT_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from arc9_sticker_pack_maker import core, dxt
+from arc9_sticker_pack_maker.core import Image, ImageFormat, VTFLib, np
+
+
+def rmse(decoded, source):
+    visible = source[..., 3] > 0
+    rgb_error = (decoded[..., :3].astype(np.float64) - source[..., :3]) ** 2
+    rgb = float(np.sqrt(rgb_error[visible].mean())) if visible.any() else 0.0
+    alpha = float(np.sqrt(((decoded[..., 3].astype(np.float64) - source[..., 3]) ** 2).mean()))
+    return rgb, alpha
+
+
+def load_canvases(folder):
+    canvases = []
+    for image_info in core.discover_images(folder):
+        with Image.open(image_info["path"]) as img:
+            canvas = core.letterbox_image(img.convert("RGBA"))
+        canvases.append((image_info["original_name"], np.array(canvas)))
+    return canvases
+
+
+def bench_numpy(canvas, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        blocks = dxt.compress_dxt5(canvas)
+    elapsed = (time.perf_counter() - start) / repeat
+    decoded = dxt.decompress_dxt5(blocks, canvas.shape[1], canvas.shape[0])
+    return elapsed, rmse(decoded, canvas)
+
+
+def bench_vtflib(vtf_lib, canvas, repeat):
+    height, width = canvas.shape[:2]
+    options = vtf_lib.create_default_params_structure()
+    options.ImageFormat = ImageFormat.ImageFormatDXT5
+    options.Mipmaps = False
+    options.Thumbnail = False
+    options.Reflectivity = False
+    options.Resize = False
+    start = time.perf_counter()
+    for _ in range(repeat):
+        if not vtf_lib.image_create_single(width, height, canvas, options):
+            raise RuntimeError(vtf_lib.get_last_error())
+    elapsed = (time.perf_counter() - start) / repeat
+    size = vtf_lib.compute_image_size(width, height, 1, 1, ImageFormat.ImageFormatDXT5)
+    blocks = bytes(vtf_lib.get_image_data(0, 0, 0, 0).contents)[:size]
+    decoded = dxt.decompress_dxt5(blocks, width, height)
+    return elapsed, rmse(decoded, canvas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("folder", nargs="?", default=str(PROJECT_ROOT / "examples" / "sample_images"))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    canvases = load_canvases(args.folder)
+    if not canvases:
+        print(f"No images found in {args.folder}")
+        return
+
+    try:
+        vtf_lib = VTFLib()
+    except (OSError, NotImplementedError) as e:
+        print(f"VTFLib unavailable ({e}), benchmarking the NumPy encoder only.\n")
+        vtf_lib = None
+
+    header = f"{'image':<28} {'numpy ms':>9} {'rgb':>7} {'alpha':>7}"
+    if vtf_lib:
+        header += f" {'vtflib ms':>10} {'rgb':>7} {'alpha':>7}"
+    print(header)
+    for name, canvas in canvases:
+        elapsed, (rgb, alpha) = bench_numpy(canvas, args.repeat)
+        row = f"{name[:28]:<28} {elapsed * 1000:>9.1f} {rgb:>7.3f} {alpha:>7.3f}"
+        if vtf_lib:
+            elapsed, (rgb, alpha) = bench_vtflib(vtf_lib, canvas, args.repeat)
+            row += f" {elapsed * 1000:>10.1f} {rgb:>7.3f} {alpha:>7.3f}"
+        print(row)
+
+    # Whole-animation batches go through the encoder in a single call.
+    batch = np.stack([canvas for _, canvas in canvases])
+    start = time.perf_counter()
+    dxt.compress_dxt5(batch)
+    elapsed = time.perf_counter() - start
+    print(f"\nBatch of {len(batch)} frames: {elapsed * 1000:.1f} ms total, "
+          f"{elapsed * 1000 / len(batch):.1f} ms per frame")
+
+    if vtf_lib:
+        vtf_lib.shutdown()
+
+
+if __name__ == "__main__":
+    main()
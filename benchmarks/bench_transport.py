@@ -0,0 +1,109 @@
+"""
+Benchmark sending letterboxed frames to worker processes: pickled arrays against transport.FrameRing slots.
+
+Usage: python benchmarks/bench_transport.py [--frames N] [--size S] [--workers N] [--encode] [--repeat N]
+
+Both paths hand the same S x S RGBA frames to a process pool and keep at most
+two frames per worker in flight. "pickle" submits each frame as an array, so it
+is copied into the pipe and unpickled by the worker. "shm" copies it into a free
+slot of a FrameRing and submits only the slot index, the worker reads the slot
+in place. Workers only sum the alpha channel, unless --encode makes them DXT5
+compress the frame like a sharded animation does.
+"""
+
+import argparse
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = PROJECT_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+# core puts the bundled VTFLib wrapper that vtf_writer needs on the path.
+from arc9_sticker_pack_maker import core, transport, vtf_writer  # noqa: F401
+from arc9_sticker_pack_maker.core import ImageFormat, np
+
+
+def consume(pixels, encode):
+    if encode:
+        return len(vtf_writer.encode_surfaces(pixels, ImageFormat.ImageFormatDXT5))
+    return int(pixels[..., 3].sum(dtype=np.uint64))
+
+
+def consume_pickled(pixels, encode):
+    return consume(pixels, encode)
+
+
+def consume_slot(ring_descriptor, slot, encode):
+    return consume(transport.FrameRing.attach(*ring_descriptor).frame(slot), encode)
+
+
+def run_pickled(executor, frames, in_flight, encode):
+    results = []
+    pending = deque()
+    for pixels in frames:
+        if len(pending) == in_flight:
+            results.append(pending.popleft().result())
+        pending.append(executor.submit(consume_pickled, pixels, encode))
+    results.extend(future.result() for future in pending)
+    return results
+
+
+def run_shared(executor, frames, in_flight, encode):
+    results = []
+    pending = deque()
+    with transport.FrameRing.create(in_flight, frames[0].shape) as ring:
+        for pixels in frames:
+            slot = ring.acquire()
+            if slot is None:
+                future, slot = pending.popleft()
+                results.append(future.result())
+            ring.frame(slot)[:] = pixels
+            pending.append((executor.submit(consume_slot, ring.descriptor, slot, encode), slot))
+        results.extend(future.result() for future, _ in pending)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--size", type=int, default=512)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--encode", action="store_true")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    # A handful of distinct frames, cycled, keeps the generator out of the timing.
+    distinct = [rng.integers(0, 256, size=(args.size, args.size, 4), dtype=np.uint8) for _ in range(8)]
+    frames = [distinct[index % len(distinct)] for index in range(args.frames)]
+    megabytes = args.frames * frames[0].nbytes / 1e6
+    in_flight = 2 * args.workers
+
+    print(f"{args.frames} frames of {args.size}x{args.size} RGBA ({megabytes:.0f} MB), "
+          f"{args.workers} workers, {'DXT5 encode' if args.encode else 'alpha sum'}")
+    print(f"{'path':<7} {'s':>8} {'frames/s':>9} {'MB/s':>8}")
+    with ProcessPoolExecutor(args.workers) as executor:
+        # Start the workers before timing anything.
+        list(executor.map(int, range(args.workers)))
+        reference = None
+        for label, run in (("pickle", run_pickled), ("shm", run_shared)):
+            best = None
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                results = run(executor, frames, in_flight, args.encode)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            if reference is None:
+                reference = results
+            elif results != reference:
+                raise SystemExit(f"{label} returned different results")
+            print(f"{label:<7} {best:>8.3f} {args.frames / best:>9.0f} {megabytes / best:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
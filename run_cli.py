@@ -1,4 +1,5 @@
 from pathlib import Path
+import multiprocessing
 import sys
 
 PROJECT_ROOT = Path(__file__).resolve().parent
@@ -10,4 +11,6 @@ from arc9_sticker_pack_maker.core import main
 
 
 if __name__ == "__main__":
+    # Required for the conversion process pool in frozen Windows builds.
+    multiprocessing.freeze_support()
     main()
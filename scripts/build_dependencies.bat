@@ -1,5 +1,5 @@
 @echo off
 echo "Downloading required libraries... Please wait."
-python -m pip install --upgrade --target=./libs PySide6 pillow
+python -m pip install --upgrade --target=./libs PySide6 pillow numpy
 echo "Dependencies have been bundled successfully!"
 pause
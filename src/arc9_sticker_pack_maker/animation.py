@@ -0,0 +1,104 @@
+"""Temporal resampling of animated stickers onto the constant rate AnimatedTexture timeline."""
+
+import numpy as np
+
+from arc9_sticker_pack_maker import vtf_writer
+
+# Browsers play GIF delays below MIN_FRAME_DURATION ms at DEFAULT_FRAME_DURATION ms.
+DEFAULT_FRAME_DURATION = 100
+MIN_FRAME_DURATION = 20
+# Highest framerate picked automatically for animations with very irregular delays.
+MAX_AUTO_FPS = 50
+# Frames whose channels all differ by at most this much from the previous frame
+# are merged into it, which absorbs re-encoding noise of lossy sources.
+DUPLICATE_TOLERANCE = 2
+
+
+def normalize_duration(duration):
+    """Frame delay in ms as a browser would play it."""
+    if not duration or duration < MIN_FRAME_DURATION:
+        return DEFAULT_FRAME_DURATION
+    return duration
+
+
+def frame_changed(previous, frame, tolerance=DUPLICATE_TOLERANCE):
+    """True when two (H, W, 4) uint8 frames differ by more than tolerance in any channel."""
+    if previous.shape != frame.shape:
+        return True
+    # max - min avoids widening both frames to a signed type.
+    return int((np.maximum(previous, frame) - np.minimum(previous, frame)).max()) > tolerance
+
+
+def merge_duplicates(durations, changed):
+    """
+    Fold every frame that did not change into the one before it.
+    Returns (index of the source frame of each kept frame, their summed durations).
+    """
+    kept = []
+    merged = []
+    for index, (duration, is_new) in enumerate(zip(durations, changed)):
+        duration = normalize_duration(duration)
+        if is_new or not kept:
+            kept.append(index)
+            merged.append(duration)
+        else:
+            merged[-1] += duration
+    return kept, merged
+
+
+def auto_fps(durations):
+    """
+    Lowest framerate whose frame length fits every delay to within a quarter frame,
+    so jittery delays such as 80/90/80 ms play at one steady rate. Capped at MAX_AUTO_FPS.
+    """
+    shortest = min(durations)
+    divisor = 1
+    while 1000 * divisor / shortest <= MAX_AUTO_FPS:
+        step = shortest / divisor
+        units = [max(1, round(duration / step)) for duration in durations]
+        if all(abs(duration - count * step) <= step / 4 for duration, count in zip(durations, units)):
+            # Spread the rounding over the loop so its length stays the same.
+            return 1000 * sum(units) / sum(durations)
+        divisor += 1
+    return MAX_AUTO_FPS
+
+
+def plan_timeline(durations, changed, fps=None, max_frames=None):
+    """
+    Map variable frame delays onto a constant rate timeline.
+    Duplicate frames are merged first, then the loop is sampled every 1/fps
+    seconds (fps=None or "auto" picks it from the delays). When that needs more
+    than max_frames frames the rate is lowered to fit, keeping the loop length.
+    Returns (source frame index of every output frame, VMT framerate).
+    """
+    kept, merged = merge_duplicates(durations, changed)
+    if not fps or fps == "auto":
+        fps = auto_fps(merged)
+    total = sum(merged)
+    frame_count = max(1, round(total * fps / 1000))
+    if max_frames and frame_count > max_frames:
+        frame_count = max_frames
+    fps = frame_count * 1000 / total
+
+    # Sample the middle of every output frame.
+    ends = np.cumsum(merged)
+    ticks = (np.arange(frame_count) + 0.5) * (total / frame_count)
+    positions = np.minimum(np.searchsorted(ends, ticks, side="right"), len(kept) - 1)
+    framerate = round(fps, 2)
+    return [kept[position] for position in positions], int(framerate) if framerate.is_integer() else framerate
+
+
+def frame_budget(max_bytes, width, height, image_format):
+    """Number of frames of an animated texture (no mipmaps) that fit into max_bytes, at least one."""
+    return max(1, max_bytes // vtf_writer.compute_image_size(width, height, image_format))
+
+
+def select_frames(frames, indices):
+    """Yield frames[i] for every i of the non-decreasing indices, reading the frames iterable once."""
+    frames = iter(frames)
+    position, frame = -1, None
+    for index in indices:
+        while position < index:
+            frame = next(frames)
+            position += 1
+        yield frame
@@ -0,0 +1,169 @@
+"""Pack-wide texture memory budget solver."""
+
+import heapq
+
+import numpy as np
+
+from vtflib.enums import ImageFormat
+
+from arc9_sticker_pack_maker import formats, vtf_writer
+
+# Smallest texture side the solver will go down to.
+MIN_TEXTURE_SIZE = 16
+
+
+def candidate_sizes(max_size, min_size=MIN_TEXTURE_SIZE):
+    """Power-of-two texture sides from max_size down to min_size."""
+    sizes = []
+    size = max_size
+    while size >= min(min_size, max_size):
+        sizes.append(size)
+        size //= 2
+    return sizes
+
+
+def texture_bytes(width, height, image_format, frames=1, mipmaps=True):
+    """VRAM used by a texture, including its mip chain when it has one."""
+    levels = vtf_writer.mipmap_count(width, height) if mipmaps else 1
+    per_frame = sum(
+        vtf_writer.compute_image_size(*vtf_writer.mipmap_dimensions(width, height, level), image_format)
+        for level in range(levels)
+    )
+    return per_frame * frames
+
+
+def resize_errors(rgba, sizes):
+    """
+    Mean squared error per texel of showing an (H, W, 4) canvas with a longest
+    side of S at each smaller longest side, measured on premultiplied RGBA.
+    Each size is a box filtered downscale, so the error is the variance inside
+    each box. The short side is never reduced below one texel.
+    """
+    pixels = rgba.astype(np.float32)
+    pixels[..., :3] *= pixels[..., 3:] / 255.0
+    height, width = pixels.shape[:2]
+    source_size = max(height, width)
+    squared = pixels * pixels
+    errors = {}
+    for size in sizes:
+        factor = source_size // size
+        factor_y, factor_x = min(factor, height), min(factor, width)
+        shape = (height // factor_y, factor_y, width // factor_x, factor_x, 4)
+        mean = pixels.reshape(shape).mean(axis=(1, 3))
+        mean_of_squares = squared.reshape(shape).mean(axis=(1, 3))
+        errors[size] = float(np.maximum(mean_of_squares - mean * mean, 0).sum(axis=-1).mean())
+    return errors
+
+
+def one_bit_alpha_error(rgba):
+    """Mean squared alpha error per texel of thresholding alpha for DXT1 one bit alpha."""
+    alpha = rgba[..., 3].astype(np.float32)
+    thresholded = np.where(alpha >= 128, 255.0, 0.0)
+    return float(((alpha - thresholded) ** 2).mean())
+
+
+def build_candidates(rgba, analysis, mode, max_size, frames=1, mipmaps=True, canvas_for=None):
+    """
+    List the (size, format) choices for one sticker, given its letterboxed
+    canvas with a longest side of max_size and the format analysis of all its
+    frames. canvas_for maps a longest side to the (width, height) the sticker
+    is written at, square by default. Returns the Pareto-efficient candidates
+    as dicts, largest first.
+    """
+    canvas_for = canvas_for or (lambda size: (size, size))
+    preferred = formats.select_texture_format(analysis, mode)
+    format_errors = {preferred: 0.0}
+    # Soft alpha can still fall back to one bit alpha at half the size.
+    if mode == "auto" and preferred == ImageFormat.ImageFormatDXT5:
+        format_errors[ImageFormat.ImageFormatDXT1OneBitAlpha] = one_bit_alpha_error(rgba)
+
+    sizes = candidate_sizes(max_size)
+    errors = resize_errors(rgba, sizes)
+    candidates = [
+        {
+            "width": width,
+            "height": height,
+            "format": image_format,
+            "bytes": texture_bytes(width, height, image_format, frames, mipmaps),
+            "error": errors[size] + format_error,
+        }
+        for size, (width, height) in zip(sizes, map(canvas_for, sizes))
+        for image_format, format_error in format_errors.items()
+    ]
+
+    # Keep only candidates that lose less quality than every cheaper one.
+    candidates.sort(key=lambda candidate: (candidate["bytes"], candidate["error"]))
+    efficient = []
+    for candidate in candidates:
+        if not efficient or candidate["error"] < efficient[-1]["error"]:
+            efficient.append(candidate)
+    return efficient[::-1]
+
+
+def solve(candidate_lists, budget_bytes):
+    """
+    Pick one candidate per sticker so the total fits budget_bytes with the least
+    added error. Starts from the best candidate of every sticker and greedily
+    applies the step with the smallest error increase per byte saved, then
+    spends whatever the last steps overshot on undoing the cheapest losses.
+    Returns the chosen index into each candidate list.
+    """
+    choices = [0] * len(candidate_lists)
+    total = sum(candidates[0]["bytes"] for candidates in candidate_lists)
+    heap = []
+
+    def push_next_step(sticker):
+        candidates = candidate_lists[sticker]
+        current = choices[sticker]
+        if current + 1 < len(candidates):
+            saved = candidates[current]["bytes"] - candidates[current + 1]["bytes"]
+            added = candidates[current + 1]["error"] - candidates[current]["error"]
+            heapq.heappush(heap, (added / saved, sticker, current))
+
+    for sticker in range(len(candidate_lists)):
+        push_next_step(sticker)
+    while total > budget_bytes and heap:
+        _, sticker, step_from = heapq.heappop(heap)
+        candidates = candidate_lists[sticker]
+        total -= candidates[step_from]["bytes"] - candidates[step_from + 1]["bytes"]
+        choices[sticker] = step_from + 1
+        push_next_step(sticker)
+
+    while total < budget_bytes:
+        best = None
+        for sticker, choice in enumerate(choices):
+            if choice == 0:
+                continue
+            candidates = candidate_lists[sticker]
+            extra = candidates[choice - 1]["bytes"] - candidates[choice]["bytes"]
+            if total + extra > budget_bytes:
+                continue
+            gain = (candidates[choice]["error"] - candidates[choice - 1]["error"]) / extra
+            if best is None or gain > best[0]:
+                best = (gain, sticker, extra)
+        if best is None:
+            break
+        _, sticker, extra = best
+        choices[sticker] -= 1
+        total += extra
+    return choices
+
+
+def format_report(names, chosen, budget_bytes):
+    """
+    Render the per-sticker choices of the solver as a text table. Loss is the
+    RMSE added by the smaller size or cheaper format, not by block compression.
+    """
+    total = sum(candidate["bytes"] for candidate in chosen)
+    name_width = max([len("Sticker")] + [len(name) for name in names])
+    lines = [f"{'Sticker':<{name_width}}  {'Size':>9}  {'Format':<18}  {'VRAM KiB':>9}  {'Loss':>6}"]
+    for name, candidate in zip(names, chosen):
+        size = f"{candidate['width']}x{candidate['height']}"
+        lines.append(
+            f"{name:<{name_width}}  {size:>9}  {formats.FORMAT_NAMES[candidate['format']]:<18}  "
+            f"{candidate['bytes'] / 1024:>9.1f}  {candidate['error'] ** 0.5:>6.2f}"
+        )
+    lines.append(f"Total: {total / 1024 / 1024:.2f} MiB of a {budget_bytes / 1024 / 1024:.2f} MiB budget")
+    if total > budget_bytes:
+        lines.append("Warning: the budget cannot be met even at the smallest sizes.")
+    return "\n".join(lines)
@@ -0,0 +1,53 @@
+"""Reusable pixel buffers for the letterboxing hot loop."""
+
+import os
+import threading
+
+import numpy as np
+
+
+class CanvasPool:
+    """
+    A per-process pool of (H, W, 4) uint8 RGBA canvases keyed by shape.
+
+    Letterboxing an animation writes every frame into one of a few pooled
+    canvases instead of allocating (and page faulting in) a fresh one per frame.
+    Buffers are handed out as they were released, letterbox_pixels clears
+    whatever part of a canvas it does not overwrite.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_idle_buffers=8):
+        self.max_idle_buffers = max_idle_buffers
+        self._lock = threading.Lock()
+        self._idle = []
+        self._pid = os.getpid()
+
+    @classmethod
+    def shared(cls):
+        """Return the pool of the current process, creating it on first use."""
+        with cls._shared_lock:
+            pool = cls._shared
+            # A forked child must not hand out buffers its parent may still be using.
+            if pool is None or pool._pid != os.getpid():
+                pool = cls()
+                cls._shared = pool
+            return pool
+
+    def acquire(self, width, height):
+        """Return an uninitialized (height, width, 4) canvas."""
+        shape = (height, width, 4)
+        with self._lock:
+            for index, buffer in enumerate(self._idle):
+                if buffer.shape == shape:
+                    return self._idle.pop(index)
+        return np.empty(shape, dtype=np.uint8)
+
+    def release(self, buffer):
+        """Give a canvas back. The oldest idle canvas is dropped once the pool is full."""
+        with self._lock:
+            self._idle.append(buffer)
+            if len(self._idle) > self.max_idle_buffers:
+                self._idle.pop(0)
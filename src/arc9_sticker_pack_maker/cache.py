@@ -0,0 +1,129 @@
+"""Content-addressed cache of finished VTF files, shared between pack builds."""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+# Bump whenever the encoders change their output for the same input and settings.
+CACHE_FORMAT_VERSION = 3
+DEFAULT_CACHE_SIZE_MB = 1024
+_HASH_CHUNK_SIZE = 1 << 20
+
+
+def hash_file(path, digest=None):
+    """Feed the bytes of a file into a hashlib digest (SHA-256 by default) and return it."""
+    digest = digest or hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest
+
+
+class ConversionCache:
+    """
+    Finished .vtf blobs keyed on the source bytes plus every output-affecting setting.
+    Each entry is <key>.vtf with a <key>.json sidecar holding what the VMT needs.
+    Entries are evicted least recently used first once the cache outgrows max_bytes.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_CACHE_SIZE_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _settings_digest(self, key_settings):
+        digest = hashlib.sha256()
+        digest.update(json.dumps(
+            {"version": CACHE_FORMAT_VERSION, "settings": key_settings}, sort_keys=True
+        ).encode("utf-8"))
+        return digest
+
+    def make_key(self, source_path, key_settings):
+        """Hash the source file together with the settings that shape the output."""
+        return hash_file(source_path, self._settings_digest(key_settings)).hexdigest()
+
+    def make_key_from_bytes(self, source, key_settings):
+        """Same key as make_key, for source bytes that were already read into memory."""
+        digest = self._settings_digest(key_settings)
+        digest.update(source)
+        return digest.hexdigest()
+
+    def _entry_paths(self, key):
+        return os.path.join(self.cache_dir, f"{key}.vtf"), os.path.join(self.cache_dir, f"{key}.json")
+
+    def lookup(self, key):
+        """Return the stored metadata for a key, or None on a miss."""
+        blob_path, meta_path = self._entry_paths(key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                metadata = json.load(f)
+            # Mark the entry as recently used for eviction.
+            os.utime(blob_path)
+        except (OSError, ValueError):
+            return None
+        return metadata
+
+    def restore(self, key, destination):
+        """Place the cached VTF at destination, hardlinking when the filesystem allows it."""
+        blob_path, _ = self._entry_paths(key)
+        if os.path.lexists(destination):
+            os.remove(destination)
+        try:
+            os.link(blob_path, destination)
+        except OSError:
+            shutil.copy2(blob_path, destination)
+
+    def store(self, key, vtf_path, metadata):
+        """Copy a freshly written VTF into the cache and evict old entries if needed."""
+        blob_path, meta_path = self._entry_paths(key)
+
+        def copy_vtf(f):
+            # Copy rather than link so rewriting the output can never corrupt the cache.
+            with open(vtf_path, "rb") as source:
+                shutil.copyfileobj(source, f)
+
+        self._write_atomic(blob_path, copy_vtf)
+        # The sidecar is written last, an entry only counts once it exists.
+        self._write_atomic(meta_path, lambda f: f.write(json.dumps(metadata).encode("utf-8")))
+        self.evict()
+
+    def _write_atomic(self, path, write):
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(".vtf"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.name[:-4]))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            # Drop the sidecar first so a half deleted entry is never a hit.
+            for path in reversed(self._entry_paths(key)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            total -= size
@@ -1,10 +1,18 @@
 import os
 import sys
 import re
+import io
+import time
+import argparse
+import itertools
+import multiprocessing
 import subprocess
 import shutil
+import sqlite3
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from pathlib import Path
-from ctypes import cast, POINTER, c_byte
 
 # --- Determine the base path for bundled assets and modules ---
 if getattr(sys, 'frozen', False):
@@ -29,7 +37,7 @@ if base_path_str not in sys.path:
 
 # --- Dependency Management ---
 try:
-    from PIL import Image, ImageSequence
+    from PIL import GifImagePlugin, Image, ImageSequence
 except ImportError:
     print("ERROR: Pillow (PIL) is not found in the 'libs' folder or Python path.")
     print("Please ensure the 'libs' folder with Pillow is in the same directory as this script.")
@@ -38,7 +46,16 @@ except ImportError:
     sys.exit(1)
 
 try:
-    from vtflib import VTFLib, ImageFlag, ImageFormat
+    import numpy as np
+except ImportError:
+    print("ERROR: NumPy is not found in the 'libs' folder or Python path.")
+    print("Please ensure the 'libs' folder with NumPy is in the same directory as this script.")
+    if sys.stdin and sys.stdin.isatty():
+        input("\nPress Enter to exit.")
+    sys.exit(1)
+
+try:
+    from vtflib import VTFLib, VTFLibSession, ImageFlag, ImageFormat
 except ImportError as e:
     print("ERROR: Could not import the VTFLib wrapper.")
     print("Please ensure the local 'vendor/vtflib_wrapper' package is present.")
@@ -46,6 +63,11 @@ except ImportError as e:
         input("\nPress Enter to exit.")
     sys.exit(1)
 
+from arc9_sticker_pack_maker import (
+    animation, budget, buffers, cache, formats, index, manifest, palette, pipeline, probe, schedule,
+    transport, vtf_writer,
+)
+
 # --- Main Application Logic ---
 
 # Compile regex patterns once at module level for better performance
@@ -75,6 +97,66 @@ SOUND_FIELDS_SINGLE = ("install_sound", "uninstall_sound", "impact_sound")
 SOUND_FIELDS_MULTI = ("shoot_sounds", "shoot_silenced_sounds", "dryfire_sounds")
 SUPPORTED_SOUND_EXTENSIONS = {".mp3", ".wav", ".ogg"}
 
+# "vtflib" writes through the bundled VTFLib binaries (Windows only), "native" uses
+# the NumPy writer in vtf_writer and "auto" picks whichever works on this platform.
+VTF_BACKENDS = ("auto", "vtflib", "native")
+DEFAULT_CONVERSION_SETTINGS = {
+    "backend": "auto",
+    "texture_format": "auto",
+    # Decode, encode and write animated stickers one frame at a time instead of
+    # holding every frame in memory. Costs a second decoding pass.
+    "stream_frames": False,
+    # Directory of the content-addressed VTF cache, None disables it.
+    "cache_dir": None,
+    "cache_size_mb": cache.DEFAULT_CACHE_SIZE_MB,
+    # Largest sticker canvas side and how canvases are sized (see SIZE_POLICIES).
+    "max_texture_size": 512,
+    "size_policy": "fixed",
+    "resampling": "lanczos",
+    "canvas": "square",
+    # Animation retiming (see retime_animation). Setting any of these merges duplicate
+    # frames and resamples the animation to a constant framerate, "auto" or None picks
+    # the rate from the frame delays. max_animation_bytes caps the texture per sticker.
+    "animation_fps": None,
+    "max_frames": None,
+    "max_animation_bytes": None,
+    # Animations with at least twice this many frames are split into shards of at
+    # least this many frames, converted on several workers at once. 0 disables it.
+    "shard_frames": 32,
+    # How the frames of a sharded animation reach the encoding workers (see SHARD_TRANSPORTS).
+    "shard_transport": "redecode",
+}
+# "redecode" has every shard decode and letterbox the frames it encodes itself.
+# "shared-memory" decodes them once, in the coordinating process, into the slots of
+# a transport.FrameRing the workers encode from, so only slot indices are sent.
+SHARD_TRANSPORTS = ("redecode", "shared-memory")
+# Ring slots per shard: one being encoded plus one letterboxed ahead of it.
+RING_SLOTS_PER_SHARD = 2
+# Default canvas side of a sticker.
+STICKER_MAX_SIZE = DEFAULT_CONVERSION_SETTINGS["max_texture_size"]
+# "fixed" scales every image to fill a max_texture_size canvas. "native" snaps the
+# canvas to the smallest power of two that fits the source, capped at
+# max_texture_size, so small sources are never upscaled or resampled.
+SIZE_POLICIES = ("fixed", "native")
+# "nearest" keeps pixel art crisp when an image has to be scaled.
+RESAMPLING_FILTERS = {"lanczos": Image.LANCZOS, "nearest": Image.NEAREST}
+# Keep GIF frames that share a palette in P mode instead of letting Pillow expand
+# each one to RGB(A). iter_rgba_frames expands them with a palette lookup table.
+if hasattr(GifImagePlugin.LoadingStrategy, "RGB_AFTER_DIFFERENT_PALETTE_ONLY"):
+    GifImagePlugin.LOADING_STRATEGY = GifImagePlugin.LoadingStrategy.RGB_AFTER_DIFFERENT_PALETTE_ONLY
+# "square" letterboxes onto a square canvas. "tight" shrinks the short side to the
+# smallest power of two that still fits, so wide and tall stickers carry less padding.
+CANVAS_MODES = ("square", "tight")
+# Transparent texels kept on both ends of the short side of a tight canvas. The
+# texture is clamped there, so the edge texels must be empty. One DXT block wide.
+TIGHT_CANVAS_MARGIN = 4
+# Large LANCZOS downscales first shrink by whole factors with a box filter (JPEG
+# decoding at a reduced scale, Image.reduce) while keeping at least this much
+# oversampling for the final resample, which is visually indistinguishable.
+REDUCING_GAP = 3.0
+# Modes letterbox_image can resize without converting to RGBA first.
+DIRECT_RESIZE_MODES = ("RGB", "RGBA", "L", "LA")
+
 def remove_emojis(text):
     """Removes a wide range of emojis and symbols from a string."""
     if not text: return ""
@@ -91,6 +173,28 @@ def sanitize_for_filename(name, strict=True):
         # Allow spaces, preserve case, but remove system illegal chars
         return _ILLEGAL_FILENAME_CHARS_PATTERN.sub('', name_no_emoji).strip()
 
+def unique_compact_name(print_name, subfolder, existing_names):
+    """
+    Return the compact name of a sticker that is not in existing_names. A name
+    that is taken is qualified with the sticker's subfolder names, innermost
+    first (e.g. cute_logo, then characters_cute_logo), before a counter is added.
+    """
+    compact_name = sanitize_for_filename(print_name, strict=True)
+    if not compact_name or compact_name not in existing_names:
+        return compact_name
+    qualified_name = compact_name
+    for part in reversed(subfolder.replace("\\", "/").split("/")):
+        part = sanitize_for_filename(part, strict=True)
+        if not part:
+            continue
+        qualified_name = f"{part}_{qualified_name}"
+        if qualified_name not in existing_names:
+            return qualified_name
+    counter = 1
+    while f"{compact_name}_{counter}" in existing_names:
+        counter += 1
+    return f"{compact_name}_{counter}"
+
 def lua_escape_string(value):
     """Escape a value for use inside a quoted Lua string."""
     return str(value or "").replace("\\", "\\\\").replace('"', '\\"')
@@ -272,64 +376,235 @@ def iter_sorted_files(folder_path):
         files = [entry for entry in entries if entry.is_file()]
     yield from sorted(files, key=lambda entry: entry.name.lower())
 
-def discover_images(folder_path):
-    """Return Pillow-readable image metadata from a folder."""
-    images = []
-    for entry in iter_sorted_files(folder_path):
-        try:
-            with Image.open(entry.path) as img:
-                is_animated = getattr(img, 'is_animated', False) and img.n_frames > 1
-                images.append({
+def scan_directory(folder_path):
+    """Return the files and the subfolders of a folder, each sorted by name. Hidden and symlinked folders are skipped."""
+    files = []
+    folders = []
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            if entry.is_file():
+                files.append(entry)
+            elif entry.is_dir(follow_symlinks=False) and not entry.name.startswith("."):
+                folders.append(entry)
+    files.sort(key=lambda entry: entry.name.lower())
+    folders.sort(key=lambda entry: entry.name.lower())
+    return files, folders
+
+def walk_image_folders(folder_path, recursive=False):
+    """
+    Yield (subfolder, folder path, sorted files) for the folder and, if recursive,
+    every folder below it in depth-first name order. subfolder is the path relative
+    to folder_path with forward slashes, "" for folder_path itself. Listing a folder
+    mostly waits on the file system, so each folder is listed on a thread pool as
+    soon as its parent has been, ahead of the folders being yielded.
+    """
+    if not recursive:
+        yield "", folder_path, list(iter_sorted_files(folder_path))
+        return
+
+    executor = ThreadPoolExecutor()
+
+    def scan(path):
+        files, subfolders = scan_directory(path)
+        return files, [(entry, executor.submit(scan, entry.path)) for entry in subfolders]
+
+    try:
+        stack = [("", folder_path, executor.submit(scan, folder_path))]
+        while stack:
+            subfolder, path, listing = stack.pop()
+            try:
+                files, children = listing.result()
+            except OSError as e:
+                if not subfolder:
+                    raise
+                print(f"Warning: Skipping folder '{path}': {e}")
+                continue
+            yield subfolder, path, files
+            stack.extend(reversed([
+                (f"{subfolder}/{entry.name}" if subfolder else entry.name, entry.path, child)
+                for entry, child in children
+            ]))
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def open_discovery_index():
+    """Open the persistent discovery index, or return None when it cannot be used."""
+    try:
+        return index.DiscoveryIndex()
+    except (OSError, sqlite3.Error) as e:
+        print(f"Warning: discovery index unavailable ({e}), scanning every file.")
+        return None
+
+def iter_discovered_images(folder_path, use_index=True, recursive=False):
+    """
+    Yield Pillow-readable image metadata from a folder as the files are probed.
+    Files are probed from their headers (see probe.probe_image), so animations
+    are never decoded here. The size, mode and frame count (None if not counted)
+    are kept for conversion. With use_index, probe results come from the
+    persistent discovery index, so only new or changed files are opened. With recursive, images of nested folders are included and their
+    relative folder becomes the sticker's subfolder.
+    """
+    discovery_index = open_discovery_index() if use_index else None
+    try:
+        for subfolder, path, files in walk_image_folders(folder_path, recursive):
+            for entry in files:
+                record = discovery_index.probe(entry) if discovery_index else probe.probe_image(entry.path)
+                if record is None:
+                    continue
+                yield {
                     "path": entry.path,
                     "original_name": os.path.splitext(entry.name)[0],
-                    "type": "animated" if is_animated else "static",
-                })
-        except (OSError, SyntaxError):
-            continue
-    return images
+                    "type": "animated" if record["is_animated"] else "static",
+                    "format": record["format"],
+                    "width": record["width"],
+                    "height": record["height"],
+                    "mode": record["mode"],
+                    "frame_count": record["frame_count"],
+                    "subfolder": subfolder,
+                }
+            if discovery_index:
+                discovery_index.prune(path, [entry.path for entry in files])
+    finally:
+        if discovery_index:
+            discovery_index.close()
+
+def discover_images(folder_path, use_index=True, recursive=False):
+    """Return the metadata of every image in a folder, see iter_discovered_images."""
+    return list(iter_discovered_images(folder_path, use_index, recursive))
 
-def letterbox_image(img, max_size=512):
+def next_power_of_two(value):
+    return 1 << max(0, int(value) - 1).bit_length()
+
+def sticker_canvas_size(width, height, max_size=STICKER_MAX_SIZE, size_policy="fixed"):
+    """Side of the square power-of-two canvas an image of this size is letterboxed onto."""
+    if size_policy == "native":
+        return min(next_power_of_two(max(width, height)), max_size)
+    return max_size
+
+def sticker_canvas_dimensions(width, height, max_size=STICKER_MAX_SIZE, size_policy="fixed", canvas_mode="square"):
     """
-    Resizes and letterboxes an image to a square power-of-two canvas.
-    Scales the image to have its largest dimension equal to max_size,
-    preserving aspect ratio, to ensure stickers are large and not stretched.
+    Return (canvas width, canvas height, scaled width, scaled height) for letterboxing
+    an image of this size. The long side of the canvas is always sticker_canvas_size.
+    """
+    max_dim = max(width, height)
+    canvas_size = sticker_canvas_size(width, height, max_size, size_policy)
+    target_size = canvas_size if size_policy == "fixed" else min(max_dim, canvas_size)
+    if max_dim == target_size:
+        new_w, new_h = width, height
+    else:
+        scale = target_size / max_dim
+        new_w, new_h = max(1, int(width * scale)), max(1, int(height * scale))
+    if canvas_mode != "tight" or new_w == new_h:
+        return canvas_size, canvas_size, new_w, new_h
+
+    short_side = min(next_power_of_two(min(new_w, new_h) + 2 * TIGHT_CANVAS_MARGIN), canvas_size)
+    if new_w > new_h:
+        return canvas_size, short_side, new_w, new_h
+    return short_side, canvas_size, new_w, new_h
+
+def letterbox_dimensions(width, height, letterbox=None):
+    """sticker_canvas_dimensions for the keyword arguments of letterbox_image (see letterbox_options)."""
+    letterbox = letterbox or {}
+    return sticker_canvas_dimensions(
+        width, height,
+        letterbox.get("max_size", STICKER_MAX_SIZE),
+        letterbox.get("size_policy", "fixed"),
+        letterbox.get("canvas_mode", "square"),
+    )
+
+def letterbox_pixels(img, out=None, max_size=STICKER_MAX_SIZE, resample="lanczos", size_policy="fixed", canvas_mode="square"):
+    """
+    Resizes and letterboxes an image to a power-of-two canvas held in a
+    (H, W, 4) uint8 RGBA array, see letterbox_image. The canvas is written into
+    out when given (it must have the canvas shape), otherwise a new array.
+    Returns the array, or None for an empty image.
     """
     w, h = img.width, img.height
     if w == 0 or h == 0:
         return None # Skip empty frames
 
-    # 1. Calculate scaling factor to make the largest dimension match max_size
-    max_dim = max(w, h)
-    if max_dim == max_size:
+    # 1. Work out the canvas and the size the image is scaled to on it
+    canvas_w, canvas_h, new_w, new_h = sticker_canvas_dimensions(w, h, max_size, size_policy, canvas_mode)
+    if out is None:
+        out = np.empty((canvas_h, canvas_w, 4), dtype=np.uint8)
+    elif out.shape != (canvas_h, canvas_w, 4):
+        raise ValueError(f"Canvas buffer has shape {out.shape}, expected {(canvas_h, canvas_w, 4)}.")
+    if (new_w, new_h) == (w, h):
         # Already the right size, just need to center on canvas
-        new_w, new_h = w, h
         img_resized = img
     else:
-        scale = max_size / max_dim
-        new_w, new_h = int(w * scale), int(h * scale)
         # 2. Resize the image with the new dimensions
-        # Using LANCZOS for high-quality resizing
-        img_resized = img.resize((new_w, new_h), Image.LANCZOS)
-
-    # 3. Create a transparent square canvas. Since max_size is a power of two,
-    #    we can use it directly for the canvas size.
-    canvas = Image.new("RGBA", (max_size, max_size), (0, 0, 0, 0))
-
-    # 4. Paste the resized image onto the center of the canvas
-    paste_x = (max_size - new_w) // 2
-    paste_y = (max_size - new_h) // 2
-    canvas.paste(img_resized, (paste_x, paste_y))
+        # LANCZOS by default for high-quality resizing, NEAREST for pixel art
+        reducing_gap = REDUCING_GAP if resample == "lanczos" else None
+        img_resized = img.resize((new_w, new_h), RESAMPLING_FILTERS[resample], reducing_gap=reducing_gap)
+    if img_resized.mode != "RGBA":
+        img_resized = img_resized.convert("RGBA")
+
+    # 3. Clear the transparent borders, the buffer may hold an older frame
+    x = (canvas_w - new_w) // 2
+    y = (canvas_h - new_h) // 2
+    out[:y] = 0
+    out[y + new_h:] = 0
+    out[y:y + new_h, :x] = 0
+    out[y:y + new_h, x + new_w:] = 0
+
+    # 4. Copy the resized image into the center of the canvas
+    out[y:y + new_h, x:x + new_w] = np.asarray(img_resized)
+    return out
+
+def letterbox_image(img, max_size=STICKER_MAX_SIZE, resample="lanczos", size_policy="fixed", canvas_mode="square"):
+    """
+    Resizes and letterboxes an image to a power-of-two canvas.
+    Scales the image to have its largest dimension equal to max_size,
+    preserving aspect ratio, to ensure stickers are large and not stretched.
+    With the "native" size policy the canvas is snapped to the source size
+    instead and only sources larger than max_size are scaled down.
+    The canvas is square unless canvas_mode is "tight" (see CANVAS_MODES).
+    """
+    pixels = letterbox_pixels(img, None, max_size, resample, size_policy, canvas_mode)
+    return None if pixels is None else Image.fromarray(pixels)
 
-    return canvas
+def decode_static_image(img, letterbox=None):
+    """
+    Prepare a freshly opened static image for letterbox_image without expanding
+    huge sources to full size RGBA. JPEGs are decoded at a reduced scale and
+    images in a directly resizable mode are left in it, so only the small
+    resized copy ends up as RGBA on the canvas.
+    """
+    letterbox = letterbox or {}
+    if letterbox.get("resample", "lanczos") == "lanczos":
+        _, _, new_w, new_h = letterbox_dimensions(img.width, img.height, letterbox)
+        # A no-op for formats without scaled decoding.
+        img.draft(img.mode, (int(new_w * REDUCING_GAP), int(new_h * REDUCING_GAP)))
+    # Palette images and color keyed transparency only survive a conversion to RGBA.
+    if img.mode in DIRECT_RESIZE_MODES and "transparency" not in img.info:
+        return img
+    return img.convert("RGBA")
 
 def create_addon_structure(output_path, pack_name):
     """Create the necessary directory structure for the ARC9 addon."""
     os.makedirs(os.path.join(output_path, f"arc9_{pack_name}_stickers", "lua", "arc9", "common", "attachments_bulk"), exist_ok=True)
 
-def create_vmt(vmt_path, pack_name, subfolder, compact_name, is_animated, framerate):
-    """Creates a .vmt file for either a static or animated sticker."""
+def base_texture_transform(texture_size):
+    """
+    VMT line that maps a non-square sticker texture back onto the square sticker UVs.
+    The short axis is scaled up around the center, the UVs that land outside the
+    texture read its clamped, transparent edge.
+    """
+    if not texture_size or texture_size[0] == texture_size[1]:
+        return ""
+    width, height = texture_size
+    side = max(width, height)
+    return f'\n    "$basetexturetransform" "center .5 .5 scale {side / width:g} {side / height:g} rotate 0 translate 0 0"'
+
+def create_vmt(vmt_path, pack_name, subfolder, compact_name, is_animated, framerate, texture_size=None):
+    """
+    Creates a .vmt file for either a static or animated sticker.
+    texture_size is the (width, height) of the VTF when it may not be square.
+    """
     path_parts = ["stickers", pack_name, compact_name]
     material_path = "/".join(path_parts).replace("\\", "/")
+    transform = base_texture_transform(texture_size)
 
     fingerprint = "// Generated by ARC9 Sticker Pack Maker++ by Midawek"
 
@@ -337,7 +612,7 @@ def create_vmt(vmt_path, pack_name, subfolder, compact_name, is_animated, framer
         vmt_content = f'''{fingerprint}
 "VertexLitGeneric"
 {{
-    "$basetexture" "{material_path}"
+    "$basetexture" "{material_path}"{transform}
     "$alphatest" "1"
     "$decal" "1"
     "$nocull" "1"
@@ -355,7 +630,7 @@ def create_vmt(vmt_path, pack_name, subfolder, compact_name, is_animated, framer
         vmt_content = f'''{fingerprint}
 "VertexLitGeneric"
 {{
-    "$basetexture" "{material_path}"
+    "$basetexture" "{material_path}"{transform}
     "$alphatest" "1"
     "$decal" "1"
     "$nocull" "1"
@@ -363,89 +638,914 @@ def create_vmt(vmt_path, pack_name, subfolder, compact_name, is_animated, framer
     with open(vmt_path, "w", encoding="utf-8") as f:
         f.write(vmt_content)
 
-def process_image_to_vtf(output_path, image_info, pack_name, compact_name, sticker_dir):
-    """Processes a given image (static or animated) and creates VTF and VMT files."""
+def resolve_vtf_backend(backend="auto"):
+    """Map the "auto" backend onto VTFLib on Windows and the native writer elsewhere."""
+    if backend not in VTF_BACKENDS:
+        raise ValueError(f"Unknown VTF backend '{backend}'. Choose one of: {', '.join(VTF_BACKENDS)}.")
+    if backend == "auto":
+        return "vtflib" if sys.platform == "win32" else "native"
+    return backend
+
+def resolve_conversion_settings(settings=None):
+    """Merge user conversion settings over the defaults and resolve the backend."""
+    resolved = dict(DEFAULT_CONVERSION_SETTINGS)
+    resolved.update(settings or {})
+    resolved["backend"] = resolve_vtf_backend(resolved["backend"])
+    return resolved
+
+def iter_rgba_frames(img, start=0, stop=None):
+    """
+    Yield (RGBA frame, duration in ms) for every non-empty frame of an animated
+    image, or only for those from index start up to stop. Frames before start
+    are still decoded, as GIF frames build on each other, but not converted.
+    """
+    expander = palette.PaletteExpander()
+    index = 0
+    for frame in ImageSequence.Iterator(img):
+        if frame.width == 0 or frame.height == 0:
+            continue # Skip empty frames
+        if stop is not None and index >= stop:
+            break
+        index += 1
+        if index <= start:
+            continue
+        if frame.mode == "P":
+            # The pixels live in a reused buffer, letterboxing copies them onto the canvas.
+            frame_rgba = Image.fromarray(expander.expand(frame))
+        else:
+            # Only convert if not already RGBA
+            frame_rgba = frame if frame.mode == 'RGBA' else frame.convert("RGBA")
+        yield frame_rgba, frame.info.get('duration', 100)
+
+def iter_animated_frames(img, letterbox=None, live_frames=1, start=0, stop=None):
+    """
+    Yield (letterboxed (H, W, 4) RGBA pixels, duration in ms) for every frame of an
+    animated image, or for the frames from start up to stop (see iter_rgba_frames).
+    letterbox holds keyword arguments for letterbox_image (see letterbox_options).
+    Frames are letterboxed into live_frames pooled canvases in turn, so a yielded
+    array is overwritten live_frames frames later; copy it to keep it longer.
+    """
+    pool = buffers.CanvasPool.shared()
+    live = deque()
+    try:
+        for frame, duration in iter_rgba_frames(img, start, stop):
+            canvas_w, canvas_h, _, _ = letterbox_dimensions(frame.width, frame.height, letterbox)
+            if len(live) == live_frames:
+                pool.release(live.popleft())
+            live.append(pool.acquire(canvas_w, canvas_h))
+            yield letterbox_pixels(frame, live[-1], **(letterbox or {})), duration
+    finally:
+        for canvas in live:
+            pool.release(canvas)
+
+def compute_framerate(durations):
+    """Derive the VMT framerate from the frame durations of an animation."""
+    avg_duration_ms = sum(durations) / len(durations)
+    framerate = round(1000 / avg_duration_ms) if avg_duration_ms > 0 else 15
+    if framerate == 0: framerate = 15
+    return framerate
+
+def load_animated_frames(img, letterbox=None, frame_count=None):
+    """
+    Letterbox every frame of an animated image straight into one (N, H, W, 4) array.
+    frame_count saves seeking through the file when the probe already counted the
+    frames. It is only a hint, the array grows when more frames turn up. Returns
+    the pixels and the frame durations.
+    """
+    pixels = None
+    durations = []
+    for frame, duration in iter_rgba_frames(img):
+        if pixels is None:
+            canvas_w, canvas_h, _, _ = letterbox_dimensions(frame.width, frame.height, letterbox)
+            frame_count = frame_count or getattr(img, "n_frames", 1)
+            pixels = np.empty((frame_count, canvas_h, canvas_w, 4), dtype=np.uint8)
+        elif len(durations) == len(pixels):
+            grown = np.empty((2 * len(pixels),) + pixels.shape[1:], dtype=np.uint8)
+            grown[:len(pixels)] = pixels
+            pixels = grown
+        letterbox_pixels(frame, pixels[len(durations)], **(letterbox or {}))
+        durations.append(duration)
+
+    if not durations: raise Exception("Could not extract frames from animated image.")
+    return pixels[:len(durations)], durations
+
+def animation_retiming_enabled(settings):
+    return any(settings[key] for key in ("animation_fps", "max_frames", "max_animation_bytes"))
+
+def plan_animation(durations, changed, width, height, image_format, settings):
+    """
+    Pick the source frame of every output frame and the framerate under the animation
+    settings. The byte cap is skipped when image_format is None.
+    """
+    max_frames = settings["max_frames"]
+    if settings["max_animation_bytes"] and image_format is not None:
+        byte_frames = animation.frame_budget(settings["max_animation_bytes"], width, height, image_format)
+        max_frames = min(max_frames or byte_frames, byte_frames)
+    return animation.plan_timeline(durations, changed, settings["animation_fps"], max_frames)
+
+def retime_animation(pixels, durations, image_format, settings):
+    """
+    Apply the animation settings to letterboxed (N, H, W, 4) frames.
+    Returns the frames to write and the VMT framerate.
+    """
+    if not animation_retiming_enabled(settings):
+        return pixels, compute_framerate(durations)
+    changed = [True] + [animation.frame_changed(previous, frame) for previous, frame in zip(pixels, pixels[1:])]
+    indices, framerate = plan_animation(durations, changed, pixels.shape[2], pixels.shape[1], image_format, settings)
+    return pixels[indices], framerate
+
+def choose_texture_format(pixels, mode="auto"):
+    """Pick the VTF image format for letterboxed (N, H, W, 4) sticker pixels."""
+    # All frames of an animation are analyzed together, a VTF has one format.
+    return formats.select_texture_format(formats.analyze_texture(pixels), mode)
+
+def texture_flags(image_format, width, height):
+    """VTF flags for a sticker texture; non-square ones are clamped (see base_texture_transform)."""
+    flags = formats.FORMAT_FLAGS[image_format]
+    if width != height:
+        flags |= ImageFlag.ImageFlagClampS | ImageFlag.ImageFlagClampT
+    return flags
+
+@contextmanager
+def vtflib_session():
+    """Yield VTFLib bound to a pooled image handle of this process's session."""
+    # The library is initialized once per process and shut down at exit.
+    with VTFLibSession.shared().image() as vtf_lib:
+        yield vtf_lib
+
+def write_vtf_with_vtflib(vtf_path, pixels, is_animated, image_format):
+    """Write letterboxed (N, H, W, 4) RGBA pixels to a VTF through the VTFLib binding."""
+    frame_count, h, w = pixels.shape[:3]
+    if is_animated:
+        # Block compress all frames in one batch
+        surfaces = vtf_writer.encode_surfaces(pixels, image_format)
+        write_frames_with_vtflib(vtf_path, surfaces, frame_count, w, h, image_format)
+        return
+
+    with vtflib_session() as vtf_lib:
+        options = vtf_lib.create_default_params_structure()
+        options.ImageFormat = image_format
+        options.Flags |= texture_flags(image_format, w, h)
+        options.Resize = False
+
+        # VTFLib reads the NumPy pixels in place, no intermediate bytes copy.
+        if not vtf_lib.image_create_single(w, h, pixels[0], options):
+            raise Exception(f"image_create_single failed: {vtf_lib.get_last_error()}")
+
+        if not vtf_lib.image_save(vtf_path):
+            raise Exception(f"image_save failed: {vtf_lib.get_last_error()}")
+
+def write_frames_with_vtflib(vtf_path, surfaces, frame_count, width, height, image_format):
+    """Write an animated VTF through VTFLib from an iterable of already encoded frame surfaces."""
+    with vtflib_session() as vtf_lib:
+        # 1. Create an empty multi-frame image with all required arguments
+        if not vtf_lib.image_create(width, height, frame_count, 1, 1, image_format, False, False, True):
+             raise Exception(f"image_create failed for animated VTF: {vtf_lib.get_last_error()}")
+        vtf_lib.set_image_flags(int(texture_flags(image_format, width, height)))
+
+        # 2. Add each frame's data
+        written = 0
+        for i, surface in enumerate(surfaces):
+            if i >= frame_count:
+                raise Exception(f"Got more than the expected {frame_count} frames for animated VTF.")
+            vtf_lib.set_image_data(i, 0, 0, 0, surface)
+            written += 1
+        if written != frame_count:
+            raise Exception(f"Expected {frame_count} frames for animated VTF, got {written}.")
+
+        # 3. Save the final VTF file
+        if not vtf_lib.image_save(vtf_path):
+            raise Exception(f"image_save failed: {vtf_lib.get_last_error()}")
+
+def write_vtf_native(vtf_path, pixels, is_animated, image_format):
+    """Write letterboxed (N, H, W, 4) RGBA pixels to a VTF with the NumPy writer, no VTFLib needed."""
+    # Static stickers get a full mip chain like VTFLib's default create options,
+    # animated ones are written without mipmaps like the VTFLib path.
+    vtf_writer.write_vtf(
+        vtf_path,
+        pixels,
+        image_format=image_format,
+        flags=texture_flags(image_format, pixels.shape[2], pixels.shape[1]),
+        mipmaps=not is_animated,
+    )
+
+def stream_animated_to_vtf(vtf_path, img, settings, letterbox=None, image_format=None):
+    """
+    Convert an animated image while holding only about one frame in memory.
+    A first pass picks the format and framerate, a second one encodes and
+    writes every frame as soon as it is decoded. Returns the framerate and
+    the (width, height) of the texture.
+    """
+    analysis = None
+    durations = []
+    changed = []
+    previous = None
+    # Two live canvases, each frame is compared with the previous one.
+    for pixels, duration in iter_animated_frames(img, letterbox, live_frames=2):
+        frame_analysis = formats.analyze_texture(pixels)
+        analysis = frame_analysis if analysis is None else formats.merge_texture_analyses(analysis, frame_analysis)
+        durations.append(duration)
+        changed.append(previous is None or animation.frame_changed(previous, pixels))
+        previous = pixels
+        height, width = pixels.shape[:2]
+    if not durations: raise Exception("Could not extract frames from animated image.")
+
+    if image_format is None:
+        image_format = formats.select_texture_format(analysis, settings["texture_format"])
+    # Every frame is encoded before the next one is letterboxed into the same canvas.
+    frames = (pixels for pixels, _ in iter_animated_frames(img, letterbox))
+    if animation_retiming_enabled(settings):
+        indices, framerate = plan_animation(durations, changed, width, height, image_format, settings)
+        frames = animation.select_frames(frames, indices)
+        frame_count = len(indices)
+    else:
+        framerate = compute_framerate(durations)
+        frame_count = len(durations)
+    if settings["backend"] == "native":
+        vtf_writer.write_vtf_stream(
+            vtf_path, frames, frame_count, image_format=image_format,
+            flags=texture_flags(image_format, width, height),
+        )
+    else:
+        surfaces = (vtf_writer.encode_surfaces(frame, image_format) for frame in frames)
+        write_frames_with_vtflib(vtf_path, surfaces, frame_count, width, height, image_format)
+    return framerate, (width, height)
+
+def frame_shard_count(image_info, settings, jobs):
+    """Number of workers to split the frames of a sticker over, 1 when it is not worth it."""
+    if image_info["type"] != "animated" or jobs < 2 or not settings["shard_frames"]:
+        return 1
+    return max(1, min(jobs, (image_info.get("frame_count") or 0) // settings["shard_frames"]))
+
+def analyze_frame_range(path, letterbox, start, stop=None):
+    """
+    First pass of a sharded animation, run on a worker: letterbox the frames
+    from start up to stop (the end when None) and return their merged format
+    analysis, durations, whether each differs from the frame before it, and
+    the canvas (width, height).
+    """
+    analysis = None
+    durations = []
+    changed = []
+    previous = None
+    size = None
+    with Image.open(path) as img:
+        # The frame before the range tells whether the first one changed.
+        frames = iter_animated_frames(img, letterbox, live_frames=2, start=max(start - 1, 0), stop=stop)
+        for index, (pixels, duration) in enumerate(frames, start=max(start - 1, 0)):
+            if index < start:
+                previous = pixels
+                continue
+            frame_analysis = formats.analyze_texture(pixels)
+            analysis = frame_analysis if analysis is None else formats.merge_texture_analyses(analysis, frame_analysis)
+            durations.append(duration)
+            changed.append(previous is None or animation.frame_changed(previous, pixels))
+            previous = pixels
+            size = (pixels.shape[1], pixels.shape[0])
+    return {"analysis": analysis, "durations": durations, "changed": changed, "size": size}
+
+def encode_frame_range(path, letterbox, indices, image_format):
+    """
+    Second pass of a sharded animation, run on a worker: encode the source
+    frames listed in the non-decreasing indices. Returns their surfaces in
+    order and the reflectivity of the first one.
+    """
+    surfaces = []
+    reflectivity = None
+    first = indices[0]
+    with Image.open(path) as img:
+        frames = (pixels for pixels, _ in iter_animated_frames(img, letterbox, start=first, stop=indices[-1] + 1))
+        for pixels in animation.select_frames(frames, [index - first for index in indices]):
+            if reflectivity is None:
+                reflectivity = vtf_writer.compute_reflectivity(pixels)
+            surfaces.append(vtf_writer.encode_surfaces(pixels, image_format))
+    return surfaces, reflectivity
+
+def encode_ring_frame(ring_descriptor, slot, image_format):
+    """Encode the letterboxed frame in a slot of a transport.FrameRing, run on a worker."""
+    pixels = transport.FrameRing.attach(*ring_descriptor).frame(slot)
+    surface = vtf_writer.encode_surfaces(pixels, image_format)
+    # Uncompressed formats may come back as a view of the slot, which is reused.
+    return surface.copy() if np.shares_memory(surface, pixels) else surface
+
+def encode_frames_shared(path, letterbox, indices, image_format, executor, size, slot_count):
+    """
+    Second pass of a sharded animation with the "shared-memory" transport: decode
+    and letterbox the source frames listed in the non-decreasing indices once,
+    here, straight into the slots of a transport.FrameRing, and encode them on
+    the workers of executor. A slot is reused once its frame is encoded. Returns
+    the surfaces in order and the reflectivity of the first frame.
+    """
+    width, height = size
+    surfaces = []
+    reflectivity = None
+    pending = deque()
+    with transport.FrameRing.create(slot_count, (height, width, 4)) as ring:
+        def collect():
+            future, slot = pending.popleft()
+            surfaces.append(future.result())
+            ring.release(slot)
+
+        with Image.open(path) as img:
+            frames = (frame for frame, _ in iter_rgba_frames(img, stop=indices[-1] + 1))
+            for frame in animation.select_frames(frames, indices):
+                slot = ring.acquire()
+                while slot is None:
+                    collect()
+                    slot = ring.acquire()
+                letterbox_pixels(frame, ring.frame(slot), **letterbox)
+                if reflectivity is None:
+                    reflectivity = vtf_writer.compute_reflectivity(ring.frame(slot))
+                pending.append((executor.submit(encode_ring_frame, ring.descriptor, slot, image_format), slot))
+        while pending:
+            collect()
+    return surfaces, reflectivity
+
+def convert_animation_sharded(vtf_path, image_info, settings, executor, shards):
+    """
+    Convert a long animation on shards workers of executor. Every shard letterboxes
+    and analyzes a range of the frames, the merged analyses pick the format and
+    the animation plan, then every shard encodes its part of the output frames
+    (or, with the "shared-memory" shard_transport, the frames decoded here once)
+    and the surfaces are written in order. Returns the framerate and the
+    (width, height) of the texture, like convert_frames_to_vtf.
+    """
+    path = image_info["path"]
+    letterbox = letterbox_options(image_info, settings)
+    frame_count = image_info["frame_count"]
+    bounds = [frame_count * shard // shards for shard in range(shards)] + [None]
+    # The last shard runs to the end, in case the probe counted frames Pillow skips.
+    passes = [
+        executor.submit(analyze_frame_range, path, letterbox, bounds[shard], bounds[shard + 1])
+        for shard in range(shards)
+    ]
+    analysis = None
+    durations = []
+    changed = []
+    size = None
+    for future in passes:
+        result = future.result()
+        if result["analysis"] is not None:
+            analysis = result["analysis"] if analysis is None else formats.merge_texture_analyses(analysis, result["analysis"])
+        durations.extend(result["durations"])
+        changed.extend(result["changed"])
+        size = size or result["size"]
+    if not durations: raise Exception("Could not extract frames from animated image.")
+    width, height = size
+
+    image_format = image_info.get("image_format")
+    if image_format is None:
+        image_format = formats.select_texture_format(analysis, settings["texture_format"])
+    if animation_retiming_enabled(settings):
+        indices, framerate = plan_animation(durations, changed, width, height, image_format, settings)
+    else:
+        indices, framerate = list(range(len(durations))), compute_framerate(durations)
+
+    if settings["shard_transport"] == "shared-memory":
+        surfaces, reflectivity = encode_frames_shared(
+            path, letterbox, indices, image_format, executor, size, shards * RING_SLOTS_PER_SHARD
+        )
+    else:
+        chunk_bounds = [len(indices) * shard // shards for shard in range(shards + 1)]
+        chunks = [indices[chunk_bounds[shard]:chunk_bounds[shard + 1]] for shard in range(shards)]
+        encodes = [executor.submit(encode_frame_range, path, letterbox, chunk, image_format) for chunk in chunks if chunk]
+        surfaces = []
+        reflectivity = None
+        for future in encodes:
+            chunk_surfaces, chunk_reflectivity = future.result()
+            surfaces.extend(chunk_surfaces)
+            reflectivity = reflectivity or chunk_reflectivity
+
+    if settings["backend"] == "native":
+        vtf_writer.write_vtf_surfaces(
+            vtf_path, surfaces, width, height, image_format,
+            flags=texture_flags(image_format, width, height), reflectivity=reflectivity,
+        )
+    else:
+        write_frames_with_vtflib(vtf_path, surfaces, len(surfaces), width, height, image_format)
+    return framerate, (width, height)
+
+def open_conversion_cache(settings):
+    """Return the ConversionCache configured in settings, or None when caching is off."""
+    if not settings.get("cache_dir"):
+        return None
+    return cache.ConversionCache(settings["cache_dir"], int(settings["cache_size_mb"] * 1024 * 1024))
+
+def letterbox_options(image_info, settings):
+    """Keyword arguments for letterbox_image for one sticker under the given settings."""
+    return {
+        # A VRAM budget plan may have fixed a smaller size for this sticker.
+        "max_size": image_info.get("texture_size", settings["max_texture_size"]),
+        "resample": settings["resampling"],
+        "size_policy": settings["size_policy"],
+        "canvas_mode": settings["canvas"],
+    }
+
+def cache_key_settings(image_info, settings):
+    """Everything besides the source bytes that changes the VTF written for a sticker."""
+    key_settings = {
+        "type": image_info["type"],
+        "backend": settings["backend"],
+        "texture_format": settings["texture_format"],
+        "image_format": image_info.get("image_format"),
+        **letterbox_options(image_info, settings),
+    }
+    if image_info["type"] == "animated":
+        for key in ("animation_fps", "max_frames", "max_animation_bytes"):
+            key_settings[key] = settings[key]
+    return key_settings
+
+def process_image_to_vtf(output_path, image_info, pack_name, compact_name, sticker_dir, settings=None,
+                         frame_executor=None, frame_shards=1):
+    """
+    Processes a given image (static or animated) and creates VTF and VMT files.
+    Returns a dict describing the conversion on success ("cache" is "hit", "miss"
+    or None when caching is off) and False on failure. With a frame_executor and
+    frame_shards > 1 an animation is converted on several of its workers (see
+    convert_animation_sharded), this must then run outside of them.
+    """
     subfolder = image_info.get("subfolder", "")
     
     vtf_path = os.path.join(sticker_dir, f"{compact_name}.vtf")
     vmt_path = os.path.join(sticker_dir, f"{compact_name}.vmt")
     
-    vtf_lib = VTFLib()
     try:
-        with Image.open(image_info["path"]) as img:
-            is_animated = image_info["type"] == 'animated' and getattr(img, 'is_animated', False)
+        settings = resolve_conversion_settings(settings)
+        conversion_cache = open_conversion_cache(settings)
+        cache_status = None
+        if conversion_cache:
+            cache_key = conversion_cache.make_key(image_info["path"], cache_key_settings(image_info, settings))
+            cached = conversion_cache.lookup(cache_key)
+            if cached:
+                conversion_cache.restore(cache_key, vtf_path)
+                create_vmt(
+                    vmt_path, pack_name, subfolder, compact_name,
+                    cached["is_animated"], cached["framerate"], cached["texture_size"],
+                )
+                return {"cache": "hit"}
+            cache_status = "miss"
+
+        # Never write through an existing file, it may be hardlinked into the cache.
+        if os.path.lexists(vtf_path):
+            os.remove(vtf_path)
+
+        if frame_executor is not None and frame_shards > 1:
+            is_animated = True
+            framerate, texture_size = convert_animation_sharded(
+                vtf_path, image_info, settings, frame_executor, frame_shards
+            )
+        else:
+            with Image.open(image_info["path"]) as img:
+                is_animated, framerate, texture_size = convert_image(vtf_path, img, image_info, settings)
+
+        if conversion_cache:
+            conversion_cache.store(cache_key, vtf_path, {
+                "is_animated": is_animated,
+                "framerate": framerate,
+                "texture_size": list(texture_size),
+            })
+        create_vmt(vmt_path, pack_name, subfolder, compact_name, is_animated, framerate, texture_size)
+        return {"cache": cache_status}
+
+    except Exception as e:
+        print(f"Error processing {image_info['original_name']}: {e}")
+        return False
+
+def convert_image(vtf_path, img, image_info, settings):
+    """
+    Write the VTF of an opened sticker image to vtf_path (a path, or a binary
+    file object for the native writer). Returns whether it is animated, its
+    framerate and the (width, height) of the texture.
+    """
+    is_animated = image_info["type"] == 'animated' and getattr(img, 'is_animated', False)
+
+    # A VRAM budget plan may have fixed the size and format of this sticker.
+    texture_plan = {
+        "letterbox": letterbox_options(image_info, settings),
+        "image_format": image_info.get("image_format"),
+    }
+    if is_animated and settings["stream_frames"]:
+        framerate, texture_size = stream_animated_to_vtf(vtf_path, img, settings, **texture_plan)
+    else:
+        framerate, texture_size = convert_frames_to_vtf(
+            vtf_path, img, is_animated, settings, frame_count=image_info.get("frame_count"), **texture_plan
+        )
+    return is_animated, framerate, texture_size
 
-            options = vtf_lib.create_default_params_structure()
-            options.ImageFormat = ImageFormat.ImageFormatDXT5
-            options.Flags |= ImageFlag.ImageFlagEightBitAlpha
-            options.Resize = False
+def convert_frames_to_vtf(vtf_path, img, is_animated, settings, letterbox=None, image_format=None, frame_count=None):
+    """
+    Convert an image with all its letterboxed frames in memory.
+    Returns the framerate and the (width, height) of the texture.
+    """
+    if is_animated:
+        pixels, durations = load_animated_frames(img, letterbox, frame_count)
+    else:
+        pixels = letterbox_pixels(decode_static_image(img, letterbox), **(letterbox or {}))[np.newaxis]
 
+    if image_format is None:
+        image_format = choose_texture_format(pixels, settings["texture_format"])
+    framerate = 0
+    if is_animated:
+        pixels, framerate = retime_animation(pixels, durations, image_format, settings)
+    if settings["backend"] == "native":
+        write_vtf_native(vtf_path, pixels, is_animated, image_format)
+    else:
+        write_vtf_with_vtflib(vtf_path, pixels, is_animated, image_format)
+    return framerate, (pixels.shape[2], pixels.shape[1])
+
+def sticker_budget_candidates(image_info, settings):
+    """
+    Measure one sticker for the VRAM budget solver and return its candidates.
+    The error metric uses the first frame, the format analysis all frames.
+    Returns None when the image cannot be read.
+    """
+    # Candidates start from the full size canvas, whatever an earlier plan chose.
+    letterbox = dict(letterbox_options(image_info, settings), max_size=settings["max_texture_size"])
+    try:
+        with Image.open(image_info["path"]) as img:
+            is_animated = image_info["type"] == 'animated' and getattr(img, 'is_animated', False)
+            # Scaled decoding may shrink img, the canvas sizes follow the source.
+            source_size = img.size
             if is_animated:
-                options.ImageFormat = ImageFormat.ImageFormatRGBA8888
-                # --- CORRECT ANIMATED VTF CREATION USING THE WRAPPER ---
-                frames = []
-                durations = []
-                # Convert to RGBA once for all frames if possible, otherwise convert per frame
-                for frame in ImageSequence.Iterator(img):
-                    # Only convert if not already RGBA
-                    frame_rgba = frame if frame.mode == 'RGBA' else frame.convert("RGBA")
-                    letterboxed_frame = letterbox_image(frame_rgba)
-                    if letterboxed_frame:
-                        frames.append(letterboxed_frame)
-                        durations.append(frame.info.get('duration', 100))
-
-                if not frames: raise Exception("Could not extract frames from animated image.")
-
-                w, h = frames[0].size
-                avg_duration_ms = sum(durations) / len(durations)
-                framerate = round(1000 / avg_duration_ms) if avg_duration_ms > 0 else 15
-                if framerate == 0: framerate = 15
-
-                # 1. Create an empty multi-frame image with all required arguments
-                if not vtf_lib.image_create(w, h, len(frames), 1, 1, options.ImageFormat.value, False, False, True):
-                     raise Exception(f"image_create failed for animated VTF: {vtf_lib.get_last_error()}")
-
-                # 2. Add each frame's data using the correct set_image_data method
-                for i, frame in enumerate(frames):
-                    frame_bytes = frame.tobytes()
-                    frame_buffer_ptr = cast(frame_bytes, POINTER(c_byte))
-                    # Use the correct method name: set_image_data
-                    vtf_lib.set_image_data(i, 0, 0, 0, frame_buffer_ptr)
-
-                create_vmt(vmt_path, pack_name, subfolder, compact_name, True, framerate)
+                frames = iter_animated_frames(img, letterbox, live_frames=2)
             else:
-                # --- Static Image Processing ---
-                # Only convert if not already RGBA
-                img_rgba = img if img.mode == 'RGBA' else img.convert("RGBA")
-                texture = letterbox_image(img_rgba)
-                w, h = texture.size
-                image_bytes = texture.tobytes()
-                image_buffer_ptr = cast(image_bytes, POINTER(c_byte))
-
-                if not vtf_lib.image_create_single(w, h, image_buffer_ptr, options):
-                    raise Exception(f"image_create_single failed: {vtf_lib.get_last_error()}")
-                
-                create_vmt(vmt_path, pack_name, subfolder, compact_name, False, 0)
-
-            # 3. Save the final VTF file
-            if not vtf_lib.image_save(vtf_path):
-                raise Exception(f"image_save failed: {vtf_lib.get_last_error()}")
-            
-            return True
+                frames = iter([(letterbox_pixels(decode_static_image(img, letterbox), **letterbox), 0)])
+
+            reference, duration = next(frames)
+            # The canvas of the first frame gets reused, the error metric needs it afterwards.
+            reference = reference.copy()
+            analysis = formats.analyze_texture(reference)
+            durations, changed, previous = [duration], [True], reference
+            for frame, duration in frames:
+                analysis = formats.merge_texture_analyses(analysis, formats.analyze_texture(frame))
+                durations.append(duration)
+                changed.append(animation.frame_changed(previous, frame))
+                previous = frame
+    except Exception as e:
+        print(f"Error measuring {image_info['original_name']}: {e}")
+        return None
+
+    frame_count = len(durations)
+    if is_animated and animation_retiming_enabled(settings):
+        # Without the per sticker byte cap, which only lowers the count, so this stays an upper bound.
+        indices, _ = plan_animation(durations, changed, 0, 0, None, settings)
+        frame_count = len(indices)
+
+    def canvas_for(size):
+        width, height, _, _ = sticker_canvas_dimensions(
+            *source_size, size, letterbox["size_policy"], letterbox["canvas_mode"]
+        )
+        return width, height
 
+    return budget.build_candidates(
+        reference, analysis, settings["texture_format"], max(reference.shape[:2]),
+        frames=frame_count, mipmaps=not is_animated, canvas_for=canvas_for,
+    )
+
+def apply_vram_budget(images, settings, budget_bytes, jobs=1):
+    """
+    Fit the pack into budget_bytes of texture memory by picking a size and format
+    per sticker, stored in image_info as "texture_size" and "image_format".
+    Returns the text report of the choices.
+    """
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            candidate_lists = list(executor.map(sticker_budget_candidates, images, itertools.repeat(settings)))
+    else:
+        candidate_lists = [sticker_budget_candidates(info, settings) for info in images]
+
+    measured = [(info, candidates) for info, candidates in zip(images, candidate_lists) if candidates]
+    choices = budget.solve([candidates for _, candidates in measured], budget_bytes)
+    chosen = []
+    for (info, candidates), choice in zip(measured, choices):
+        candidate = candidates[choice]
+        info["texture_size"] = max(candidate["width"], candidate["height"])
+        info["image_format"] = candidate["format"]
+        chosen.append(candidate)
+    return budget.format_report([info["original_name"] for info, _ in measured], chosen, budget_bytes)
+
+def _init_conversion_worker(backend):
+    """Load VTFLib once per pool worker so each sticker skips the library setup."""
+    if backend == "vtflib":
+        VTFLibSession.shared()
+
+def resolve_job_count(jobs=None):
+    """Return the number of conversion workers to use; None or 0 means one per CPU."""
+    if not jobs:
+        return os.cpu_count() or 1
+    return max(1, int(jobs))
+
+def convert_images(output_path, pack_name, images, sticker_dir, jobs=None, settings=None):
+    """
+    Convert stickers to VTF/VMT on a process pool.
+    Yields (image_info, result) pairs in submission order, where result is what
+    process_image_to_vtf returned (falsy on failure), so the Lua file keeps
+    the same sticker order no matter which conversion finishes first.
+    """
+    jobs = resolve_job_count(jobs)
+    settings = resolve_conversion_settings(settings)
+    if jobs == 1:
+        for info in images:
+            yield info, process_image_to_vtf(
+                output_path, info, pack_name, info["compact_name"], sticker_dir, settings
+            )
+        return
+
+    executor = ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_conversion_worker,
+        initargs=(settings["backend"],),
+    )
+    pending = deque()
+    try:
+        for info in images:
+            future = executor.submit(
+                process_image_to_vtf, output_path, info, pack_name, info["compact_name"], sticker_dir, settings
+            )
+            pending.append((info, future))
+            # Keep a small backlog per worker instead of queueing the whole pack at once.
+            while len(pending) > jobs * 2:
+                head_info, head_future = pending.popleft()
+                yield head_info, head_future.result()
+        while pending:
+            head_info, head_future = pending.popleft()
+            yield head_info, head_future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def read_sticker_source(image_info, settings, conversion_cache=None):
+    """
+    Read stage of staged_convert_images: load the source bytes of a sticker and
+    look it up in the conversion cache. Returns a job dict with the "source"
+    bytes to encode, the "cached" metadata of a cache hit, or "failed".
+    """
+    try:
+        with open(image_info["path"], "rb") as f:
+            source = f.read()
+    except OSError as e:
+        print(f"Error processing {image_info['original_name']}: {e}")
+        return {"failed": True}
+    job = {"source": source, "cache_key": None}
+    if conversion_cache:
+        cache_key = conversion_cache.make_key_from_bytes(source, cache_key_settings(image_info, settings))
+        cached = conversion_cache.lookup(cache_key)
+        if cached:
+            return {"cache_key": cache_key, "cached": cached}
+        job["cache_key"] = cache_key
+    return job
+
+def encode_sticker(image_info, source, vtf_path, settings):
+    """
+    Encode stage of staged_convert_images, run on the worker pool: decode,
+    letterbox and encode a sticker from its source bytes. The native writer
+    encodes into memory and hands the VTF bytes to the write stage, VTFLib can
+    only save to a path, so it writes vtf_path itself. Returns the conversion
+    (None on failure) and the seconds spent on it.
+    """
+    started = time.perf_counter()
+    try:
+        if settings["backend"] == "native":
+            target = io.BytesIO()
+        else:
+            # Never write through an existing file, it may be hardlinked into the cache.
+            if os.path.lexists(vtf_path):
+                os.remove(vtf_path)
+            target = vtf_path
+        with Image.open(io.BytesIO(source)) as img:
+            is_animated, framerate, texture_size = convert_image(target, img, image_info, settings)
+        conversion = {
+            "vtf": target.getvalue() if settings["backend"] == "native" else None,
+            "is_animated": is_animated,
+            "framerate": framerate,
+            "texture_size": texture_size,
+        }
+    except Exception as e:
+        print(f"Error processing {image_info['original_name']}: {e}")
+        conversion = None
+    return conversion, time.perf_counter() - started
+
+def write_sticker(image_info, job, conversion, pack_name, sticker_dir, conversion_cache=None):
+    """
+    Write stage of staged_convert_images: put the VTF, its cache entry and the
+    VMT on disk. Returns the same result as process_image_to_vtf.
+    """
+    compact_name = image_info["compact_name"]
+    subfolder = image_info.get("subfolder", "")
+    vtf_path = os.path.join(sticker_dir, f"{compact_name}.vtf")
+    vmt_path = os.path.join(sticker_dir, f"{compact_name}.vmt")
+    try:
+        if job.get("cached"):
+            cached = job["cached"]
+            conversion_cache.restore(job["cache_key"], vtf_path)
+            create_vmt(
+                vmt_path, pack_name, subfolder, compact_name,
+                cached["is_animated"], cached["framerate"], cached["texture_size"],
+            )
+            return {"cache": "hit"}
+        if job.get("failed") or conversion is None:
+            return False
+
+        if conversion["vtf"] is not None:
+            # Never write through an existing file, it may be hardlinked into the cache.
+            if os.path.lexists(vtf_path):
+                os.remove(vtf_path)
+            with open(vtf_path, "wb") as f:
+                f.write(conversion["vtf"])
+        if conversion_cache:
+            conversion_cache.store(job["cache_key"], vtf_path, {
+                "is_animated": conversion["is_animated"],
+                "framerate": conversion["framerate"],
+                "texture_size": list(conversion["texture_size"]),
+            })
+        create_vmt(
+            vmt_path, pack_name, subfolder, compact_name,
+            conversion["is_animated"], conversion["framerate"], conversion["texture_size"],
+        )
+        return {"cache": "miss" if conversion_cache else None}
     except Exception as e:
         print(f"Error processing {image_info['original_name']}: {e}")
         return False
+
+def _read_stage(images, sticker_dir, settings, conversion_cache, executor, stats, in_flight):
+    try:
+        for info in images:
+            with stats.measure():
+                job = read_sticker_source(info, settings, conversion_cache)
+            source = job.pop("source", None)
+            if source is None:
+                # Cache hits and unreadable sources skip the encode stage.
+                future = Future()
+                future.set_result((None, 0.0))
+            else:
+                vtf_path = os.path.join(sticker_dir, f"{info['compact_name']}.vtf")
+                future = executor.submit(encode_sticker, info, source, vtf_path, settings)
+            # The source bytes stay counted until the encode result is collected.
+            in_flight.put((info, job, future), len(source or b""))
+        in_flight.close()
+    finally:
+        # Discovery generators must be closed by the thread that ran them.
+        if hasattr(images, "close"):
+            images.close()
+
+def _encode_stage(in_flight, encoded, stats):
+    while True:
+        item = in_flight.get()
+        if item is pipeline.DONE:
+            break
+        info, job, future = item
+        conversion, busy = future.result()
+        if busy:
+            stats.add(busy)
+        vtf_size = len(conversion["vtf"]) if conversion and conversion["vtf"] else 0
+        encoded.put((info, job, conversion), vtf_size)
+    encoded.close()
+
+def staged_convert_images(output_path, pack_name, images, sticker_dir, build_pipeline, jobs=None, settings=None,
+                          queue_bytes=pipeline.DEFAULT_QUEUE_BYTES):
+    """
+    Convert stickers like convert_images, split into stages joined by queues
+    that hold at most queue_bytes each: a read thread loads the sources and
+    looks them up in the conversion cache, a process pool decodes, letterboxes
+    and encodes them into VTF bytes, and the write stage, in the calling
+    thread, writes the VTF and VMT files. A slow disk and a slow encoder then
+    no longer wait on each other. build_pipeline (a pipeline.Pipeline) collects
+    the stage statistics. Yields (image_info, result) in submission order.
+    """
+    jobs = resolve_job_count(jobs)
+    settings = resolve_conversion_settings(settings)
+    conversion_cache = open_conversion_cache(settings)
+    read_stats = build_pipeline.stage("read")
+    encode_stats = build_pipeline.stage("encode", jobs)
+    write_stats = build_pipeline.stage("write")
+    in_flight = build_pipeline.queue("read -> encode", queue_bytes, max_items=jobs * 2)
+    encoded = build_pipeline.queue("encode -> write", queue_bytes)
+
+    executor = ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_conversion_worker,
+        initargs=(settings["backend"],),
+    )
+    finished = False
+    try:
+        build_pipeline.start_thread(
+            "read", _read_stage, images, sticker_dir, settings, conversion_cache, executor, read_stats, in_flight
+        )
+        build_pipeline.start_thread("encode", _encode_stage, in_flight, encoded, encode_stats)
+        while True:
+            item = encoded.get()
+            if item is pipeline.DONE:
+                break
+            info, job, conversion = item
+            with write_stats.measure():
+                result = write_sticker(info, job, conversion, pack_name, sticker_dir, conversion_cache)
+            yield info, result
+        finished = True
+    except pipeline.PipelineAborted:
+        if build_pipeline.error is not None:
+            raise build_pipeline.error
+        raise
+    finally:
+        if not finished:
+            build_pipeline.abort()
+        executor.shutdown(wait=True, cancel_futures=True)
+        build_pipeline.join()
+
+def sticker_cost(image_info, settings, jobs=1):
+    """
+    Predicted seconds, peak memory and workers of converting a sticker (see
+    schedule.estimate_cost) on a pool of jobs workers, over which long
+    animations are sharded. Every shard holds its own frames, so a sharded
+    animation takes that many workers and that much more memory. Uncounted GIF
+    frames are counted here.
+    """
+    frames = 1
+    if image_info["type"] == "animated":
+        if image_info.get("frame_count") is None:
+            record = probe.probe_image(image_info["path"], count_frames=True)
+            image_info["frame_count"] = record["frame_count"] if record else None
+        frames = image_info["frame_count"] or 1
+    letterbox = letterbox_options(image_info, settings)
+    texture_width, texture_height, _, _ = sticker_canvas_dimensions(
+        image_info["width"], image_info["height"], letterbox["max_size"], letterbox["size_policy"],
+        letterbox["canvas_mode"],
+    )
+    encoded_frames = frames
+    if frames > 1 and animation_retiming_enabled(settings) and settings["max_frames"]:
+        encoded_frames = min(frames, settings["max_frames"])
+    shards = frame_shard_count(image_info, settings, jobs)
+    cost = schedule.estimate_cost(
+        image_info.get("format"), image_info["width"], image_info["height"], frames,
+        texture_width, texture_height, encoded_frames,
+        texture_format=settings["texture_format"], streamed=settings["stream_frames"] or shards > 1,
+    )
+    cost["seconds"] /= shards
+    cost["peak_bytes"] *= shards
+    cost["workers"] = shards
+    return cost
+
+def scheduled_convert_images(output_path, pack_name, images, sticker_dir, costs, jobs=None, settings=None,
+                             memory_limit=None):
+    """
+    Convert stickers like convert_images, but dispatch them longest predicted
+    first (costs from sticker_cost) and only while the predicted peak memory
+    of the running conversions stays within memory_limit, see
+    schedule.JobScheduler. Long animations are split over several workers
+    (see frame_shard_count), coordinated from a thread of this process.
+    Yields (image_info, result) as conversions finish.
+    """
+    jobs = resolve_job_count(jobs)
+    settings = resolve_conversion_settings(settings)
+    if jobs == 1:
+        yield from convert_images(output_path, pack_name, images, sticker_dir, jobs=1, settings=settings)
+        return
+
+    scheduler = schedule.JobScheduler(costs, jobs, memory_limit)
+    executor = ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_conversion_worker,
+        initargs=(settings["backend"],),
+    )
+    coordinators = ThreadPoolExecutor()
+    running = {}
+    try:
+        while True:
+            index = scheduler.take()
+            while index is not None:
+                info = images[index]
+                shards = frame_shard_count(info, settings, jobs)
+                if shards > 1:
+                    future = coordinators.submit(
+                        process_image_to_vtf, output_path, info, pack_name, info["compact_name"], sticker_dir,
+                        settings, frame_executor=executor, frame_shards=shards,
+                    )
+                else:
+                    future = executor.submit(
+                        process_image_to_vtf, output_path, info, pack_name, info["compact_name"], sticker_dir,
+                        settings,
+                    )
+                running[future] = index
+                index = scheduler.take()
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = running.pop(future)
+                scheduler.finish(index)
+                yield images[index], future.result()
     finally:
-        if vtf_lib:
-            vtf_lib.shutdown()
+        # Coordinators waiting on cancelled shards fail their sticker and return.
+        executor.shutdown(wait=True, cancel_futures=True)
+        coordinators.shutdown(wait=True)
 
-def create_lua_script(output_path, pack_name, processed_images):
-    """Create or append to the Lua script for the ARC9 addon from pre-processed info."""
+def create_lua_script(output_path, pack_name, processed_images, overwrite=False):
+    """
+    Create or append to the Lua script for the ARC9 addon from pre-processed info.
+    With overwrite, the script is regenerated from processed_images alone.
+    """
     addon_root = os.path.join(output_path, f"arc9_{pack_name}_stickers")
     lua_path = os.path.join(addon_root, "lua", "arc9", "common", "attachments_bulk", f"a9sm_{pack_name}.lua")
 
-    file_existed = os.path.exists(lua_path) and os.path.getsize(lua_path) > 0
+    file_existed = not overwrite and os.path.exists(lua_path) and os.path.getsize(lua_path) > 0
 
     # Build Lua script content in memory for better performance
     lua_content_parts = []
@@ -497,11 +1597,303 @@ SPM.StickerMaterial = "{sticker_material}"
 ARC9.LoadAttachment(SPM, "sticker_{pack_name}_{info["compact_name"]}")''')
 
     # Write all content at once
-    with open(lua_path, "a", encoding="utf-8") as f:
+    with open(lua_path, "w" if overwrite else "a", encoding="utf-8") as f:
         f.write(''.join(lua_content_parts))
 
-def main():
+def sticker_outputs(pack_name, compact_name):
+    """Material files written for a sticker, relative to the addon root."""
+    material_dir = f"materials/stickers/{pack_name}"
+    return [f"{material_dir}/{compact_name}.vtf", f"{material_dir}/{compact_name}.vmt"]
+
+def plan_incremental_build(addon_root, pack_name, images, settings, use_index=True):
+    """
+    Compare this build with the manifest of the previous one.
+    Deletes the outputs of stickers that are gone and returns (images to convert,
+    manifest of this build). Unchanged stickers with intact outputs are skipped.
+    With use_index, changed sources are hashed through the discovery index, which
+    remembers the hashes for later builds.
+    """
+    previous_stickers = manifest.load_manifest(addon_root)["stickers"]
+    build_manifest = manifest.new_manifest()
+    images_to_convert = []
+    discovery_index = open_discovery_index() if use_index else None
+    try:
+        for info in images:
+            compact_name = info["compact_name"]
+            previous = previous_stickers.get(compact_name)
+            entry_settings = dict(cache_key_settings(info, settings), subfolder=info.get("subfolder", ""))
+            entry = manifest.make_entry(
+                info["path"], entry_settings, sticker_outputs(pack_name, compact_name), previous,
+                hash_source=discovery_index.content_hash if discovery_index else None,
+            )
+            build_manifest["stickers"][compact_name] = entry
+            if not manifest.is_up_to_date(addon_root, entry, previous):
+                images_to_convert.append(info)
+    finally:
+        if discovery_index:
+            discovery_index.close()
+
+    for compact_name, previous in previous_stickers.items():
+        if compact_name not in build_manifest["stickers"]:
+            manifest.remove_outputs(addon_root, previous)
+            shutil.rmtree(
+                os.path.join(addon_root, "sound", "arc9", pack_name, "soundmods", compact_name),
+                ignore_errors=True,
+            )
+    return images_to_convert, build_manifest
+
+def byte_size(value):
+    """argparse type for a byte count with an optional K, M or G (binary) suffix."""
+    multipliers = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    text = value.strip().upper().removesuffix("B")
+    multiplier = multipliers.get(text[-1:], 1)
+    if multiplier > 1:
+        text = text[:-1]
+    try:
+        size = int(float(text) * multiplier)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {value!r}")
+    if size < 1:
+        raise argparse.ArgumentTypeError(f"size must be positive: {value!r}")
+    return size
+
+def non_negative_int(value):
+    """argparse type for options that take a whole number of at least 0."""
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"expected a number >= 0, got {value}")
+    return number
+
+def positive_int(value):
+    """argparse type for options that need a whole number of at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"expected a number >= 1, got {value}")
+    return number
+
+def power_of_two(value):
+    """argparse type for a power-of-two texture side."""
+    number = positive_int(value)
+    if number & (number - 1):
+        raise argparse.ArgumentTypeError(f"must be a power of two: {value!r}")
+    return number
+
+def animation_fps(value):
+    """argparse type for --fps: "auto" or a positive framerate."""
+    if value.strip().lower() == "auto":
+        return "auto"
+    try:
+        fps = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a framerate or auto, got {value!r}")
+    if fps <= 0:
+        raise argparse.ArgumentTypeError(f"framerate must be positive: {value!r}")
+    return fps
+
+def parse_args(argv=None):
+    """Parse command line options for the CLI."""
+    parser = argparse.ArgumentParser(description="ARC9 Sticker Pack Maker++ command line interface.")
+    parser.add_argument(
+        "-j", "--jobs",
+        type=positive_int,
+        default=None,
+        help="Number of stickers to convert in parallel (default: one per CPU core).",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=VTF_BACKENDS,
+        default=DEFAULT_CONVERSION_SETTINGS["backend"],
+        help="VTF writer: VTFLib (Windows), the built-in NumPy writer, or auto-detect (default).",
+    )
+    parser.add_argument(
+        "--texture-format",
+        choices=formats.TEXTURE_FORMAT_MODES,
+        default=DEFAULT_CONVERSION_SETTINGS["texture_format"],
+        help="Texture format policy: smallest fitting DXT format (auto, default), "
+             "smallest uncompressed format (lossless) or always DXT5 (dxt5).",
+    )
+    parser.add_argument(
+        "--max-size",
+        type=power_of_two,
+        default=DEFAULT_CONVERSION_SETTINGS["max_texture_size"],
+        metavar="N",
+        help="Largest sticker texture side, a power of two (default: 512).",
+    )
+    parser.add_argument(
+        "--size-policy",
+        choices=SIZE_POLICIES,
+        default=DEFAULT_CONVERSION_SETTINGS["size_policy"],
+        help="fixed (default) scales every sticker to --max-size, native snaps to the smallest "
+             "power of two that fits the source, capped at --max-size.",
+    )
+    parser.add_argument(
+        "--resample",
+        choices=tuple(RESAMPLING_FILTERS),
+        default=DEFAULT_CONVERSION_SETTINGS["resampling"],
+        help="Filter used when a sticker has to be scaled; nearest keeps pixel art crisp.",
+    )
+    parser.add_argument(
+        "--canvas",
+        choices=CANVAS_MODES,
+        default=DEFAULT_CONVERSION_SETTINGS["canvas"],
+        help="square (default) letterboxes onto a square canvas, tight shrinks the short side "
+             "of wide and tall stickers to the smallest power of two that fits.",
+    )
+    parser.add_argument(
+        "--stream-frames",
+        action="store_true",
+        help="Convert animated stickers one frame at a time to keep memory use low on long animations.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Reuse VTFs of unchanged stickers from this cache directory across builds.",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=positive_int,
+        default=DEFAULT_CONVERSION_SETTINGS["cache_size_mb"],
+        metavar="MB",
+        help="Size limit of the conversion cache, least recently used entries are evicted first.",
+    )
+    parser.add_argument(
+        "--vram-budget",
+        type=byte_size,
+        default=None,
+        metavar="BYTES",
+        help="Fit the whole pack into this much texture memory (e.g. 64M) by picking a "
+             "resolution and format per sticker, and print what was chosen.",
+    )
+    parser.add_argument(
+        "--fps",
+        type=animation_fps,
+        default=None,
+        help="Merge duplicate frames of animated stickers and resample them to this constant "
+             "framerate, or to one derived from the frame delays with auto.",
+    )
+    parser.add_argument(
+        "--max-frames",
+        type=positive_int,
+        default=None,
+        metavar="N",
+        help="Resample animated stickers to at most N frames (implies --fps auto).",
+    )
+    parser.add_argument(
+        "--max-animation-size",
+        type=byte_size,
+        default=None,
+        metavar="BYTES",
+        help="Resample animated stickers so each texture stays below this size, e.g. 4M "
+             "(implies --fps auto).",
+    )
+    parser.add_argument(
+        "-r", "--recursive",
+        action="store_true",
+        help="Also import images from nested folders, each folder becomes the in-game subfolder "
+             "of its stickers.",
+    )
+    parser.add_argument(
+        "--shard-frames",
+        type=non_negative_int,
+        default=DEFAULT_CONVERSION_SETTINGS["shard_frames"],
+        metavar="N",
+        help="Split animations with at least 2N frames into shards of at least N frames that "
+             "are converted on several workers at once (default: 32, 0 disables it).",
+    )
+    parser.add_argument(
+        "--shard-transport",
+        choices=SHARD_TRANSPORTS,
+        default=DEFAULT_CONVERSION_SETTINGS["shard_transport"],
+        help="How sharded animations reach the workers: each shard decodes its own frames "
+             "(redecode, default), or they are decoded once into shared memory that every "
+             "worker encodes from (shared-memory).",
+    )
+    parser.add_argument(
+        "--memory-limit",
+        type=byte_size,
+        default=None,
+        metavar="BYTES",
+        help="Only convert as many stickers at once as their predicted peak memory fits into "
+             "(default: half of the physical memory). Biggest stickers are converted first.",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Run the build as overlapping stages: reading sources and writing VTFs on threads, "
+             "encoding on the worker processes, and print how busy each stage was.",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=byte_size,
+        default=pipeline.DEFAULT_QUEUE_BYTES,
+        metavar="BYTES",
+        help="With --pipeline, the most source or VTF data each queue between stages may hold "
+             "(default: 256M).",
+    )
+    parser.add_argument(
+        "--no-index",
+        action="store_true",
+        help="Probe every file of the image folder instead of using the persistent discovery index.",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Unattended mode: name every sticker automatically and start converting as soon as "
+             "it is found, while the rest of the folder is still being scanned.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only rebuild stickers that were added or changed since the last incremental build "
+             "of this pack, remove deleted ones and regenerate the Lua file.",
+    )
+    args = parser.parse_args(argv)
+    if args.stream and (args.vram_budget or args.incremental):
+        parser.error("--stream cannot be combined with --vram-budget or --incremental, "
+                     "which need the whole pack before converting.")
+    return args
+
+def announce_images(images, folder_path):
+    """Print each discovered image as it passes through."""
+    for image_info in images:
+        print(
+            f"Found {image_info['type']} image: "
+            f"{os.path.relpath(image_info['path'], folder_path)}"
+        )
+        yield image_info
+
+def name_stickers(images, manual_naming=False):
+    """
+    Give each discovered image its print name, description and a unique compact
+    name, prompting for them with manual_naming. Stickers are yielded one at a
+    time, so conversion can start on them while later ones are still found.
+    """
+    existing_names = set()
+    for item in images:
+        default_print_name = item["original_name"].replace('_', ' ').title()
+        print_name = default_print_name
+        description = ""
+
+        if manual_naming:
+            print("\n----------------------------------------")
+            print(f"Processing: {item['original_name']}")
+            user_print_name = input(f"Enter display name (or press Enter for default: '{default_print_name}'): ")
+            if user_print_name:
+                print_name = user_print_name
+            description = input("Enter description (optional): ")
+
+        # Ensure unique compact_name, also across subfolders
+        compact_name = unique_compact_name(print_name, item.get("subfolder", ""), existing_names)
+
+        item["print_name"] = print_name
+        item["description"] = description
+        item["compact_name"] = compact_name
+        existing_names.add(compact_name)
+        yield item
+
+def main(argv=None):
     """Main script execution flow."""
+    args = parse_args(argv)
     logo = """
 ┏━ ┏━┓┏━┓┏━╸┏━┓ ━┓   ┏━┓╺┳╸╻┏━╸╻┏ ┏━╸┏━┓   ┏━┓┏━┓┏━╸╻┏    ┏┳┓┏━┓╻┏ ┏━╸┏━┓ ╻  ╻ 
 ┃  ┣━┫┣┳┛┃  ┗━┫  ┃   ┗━┓ ┃ ┃┃  ┣┻┓┣╸ ┣┳┛   ┣━┛┣━┫┃  ┣┻┓   ┃┃┃┣━┫┣┻┓┣╸ ┣┳┛╺╋╸╺╋╸
@@ -532,45 +1924,22 @@ def main():
         return
 
     # 1. DISCOVERY PHASE: Try to open all files with Pillow
-    print("\nScanning for images...")
-    images_to_process = discover_images(image_folder_path)
-    for image_info in images_to_process:
-        print(
-            f"Found {image_info['type']} image: "
-            f"{os.path.basename(image_info['path'])}"
-        )
-
     # 2. NAMING PHASE
-    processed_info = []
-    existing_names = set()
-    manual_naming = input("\nManually name each sticker and add a description? (y/n): ").lower().strip() == 'y'
-    for item in images_to_process:
-        default_print_name = item["original_name"].replace('_', ' ').title()
-        print_name = default_print_name
-        description = ""
-
-        if manual_naming:
-            print("\n----------------------------------------")
-            print(f"Processing: {item['original_name']}")
-            user_print_name = input(f"Enter display name (or press Enter for default: '{default_print_name}'): ")
-            if user_print_name:
-                print_name = user_print_name
-            description = input("Enter description (optional): ")
-        
-        compact_name = sanitize_for_filename(print_name, strict=True)
-        
-        # Ensure unique compact_name
-        original_compact = compact_name
-        counter = 1
-        while compact_name in existing_names:
-            compact_name = f"{original_compact}_{counter}"
-            counter += 1
-
-        item["print_name"] = print_name
-        item["description"] = description
-        item["compact_name"] = compact_name
-        processed_info.append(item)
-        existing_names.add(compact_name)
+    # With --stream both are generators that conversion pulls from, so the
+    # scan, naming and encoding overlap instead of running one after another.
+    print("\nScanning for images...")
+    images_to_process = announce_images(
+        iter_discovered_images(image_folder_path, use_index=not args.no_index, recursive=args.recursive),
+        image_folder_path,
+    )
+    if args.stream:
+        processed_info = []
+        images_to_convert = name_stickers(images_to_process, manual_naming=False)
+    else:
+        images_to_process = list(images_to_process)
+        manual_naming = input("\nManually name each sticker and add a description? (y/n): ").lower().strip() == 'y'
+        processed_info = list(name_stickers(images_to_process, manual_naming))
+        images_to_convert = processed_info
 
     # 3. CREATION PHASE
     create_addon_structure(output_path, pack_name)
@@ -580,24 +1949,105 @@ def main():
     sticker_dir = os.path.join(addon_root, "materials", "stickers", pack_name)
     os.makedirs(sticker_dir, exist_ok=True)
     
-    successful_images = []
-    print("\nStarting image conversion...")
-    total_images = len(processed_info)
-    for i, info in enumerate(processed_info):
-        print(f"({i+1}/{total_images}) Processing '''{info['original_name']}''' -> '''{info['compact_name']}.vtf'''...")
-        if process_image_to_vtf(output_path, info, pack_name, info["compact_name"], sticker_dir):
-            successful_images.append(info)
+    jobs = resolve_job_count(args.jobs)
+    settings = resolve_conversion_settings({
+        "backend": args.backend,
+        "texture_format": args.texture_format,
+        "stream_frames": args.stream_frames,
+        "cache_dir": args.cache_dir,
+        "cache_size_mb": args.cache_size,
+        "max_texture_size": args.max_size,
+        "size_policy": args.size_policy,
+        "resampling": args.resample,
+        "canvas": args.canvas,
+        "animation_fps": args.fps,
+        "max_frames": args.max_frames,
+        "max_animation_bytes": args.max_animation_size,
+        "shard_frames": args.shard_frames,
+        "shard_transport": args.shard_transport,
+    })
+    if args.vram_budget:
+        print("\nFitting the pack into the VRAM budget...")
+        print(apply_vram_budget(processed_info, settings, args.vram_budget, jobs))
+
+    build_manifest = None
+    if args.incremental:
+        images_to_convert, build_manifest = plan_incremental_build(
+            addon_root, pack_name, processed_info, settings, use_index=not args.no_index
+        )
+        print(f"\nIncremental build: {len(processed_info) - len(images_to_convert)} sticker(s) unchanged.")
+
+    costs = None
+    if not args.stream:
+        costs = [sticker_cost(info, settings, jobs) for info in images_to_convert]
+        memory_limit = args.memory_limit or schedule.default_memory_limit()
+        predicted_seconds = schedule.predict_build_seconds(costs, jobs, memory_limit)
+        print(
+            f"\nPredicted conversion time: about {schedule.format_seconds(predicted_seconds)} "
+            f"for {len(images_to_convert)} sticker(s)."
+        )
+
+    print(f"\nStarting image conversion with {jobs} worker(s)...")
+    conversion_started = time.perf_counter()
+    total_images = None if args.stream else len(images_to_convert)
+    failed_names = set()
+    cache_counts = {"hit": 0, "miss": 0}
+    build_pipeline = pipeline.Pipeline() if args.pipeline else None
+    if build_pipeline:
+        if costs is not None:
+            # The pipeline bounds memory with its queues, it only needs the order.
+            order = sorted(range(len(costs)), key=lambda index: costs[index]["seconds"], reverse=True)
+            images_to_convert = [images_to_convert[index] for index in order]
+        conversions = staged_convert_images(
+            output_path, pack_name, images_to_convert, sticker_dir, build_pipeline,
+            jobs=jobs, settings=settings, queue_bytes=args.queue_size,
+        )
+    elif costs is not None:
+        conversions = scheduled_convert_images(
+            output_path, pack_name, images_to_convert, sticker_dir, costs,
+            jobs=jobs, settings=settings, memory_limit=memory_limit,
+        )
+    else:
+        conversions = convert_images(output_path, pack_name, images_to_convert, sticker_dir, jobs=jobs, settings=settings)
+    for i, (info, success) in enumerate(conversions):
+        if args.stream:
+            # Conversions come back in discovery order, which is the pack order.
+            processed_info.append(info)
+        status = "Converted" if success else "Failed"
+        progress = f"{i+1}/{total_images}" if total_images is not None else f"{i+1}"
+        print(f"({progress}) {status} '''{info['original_name']}''' -> '''{info['compact_name']}.vtf'''")
+        if not success:
+            failed_names.add(info["compact_name"])
+        elif success["cache"]:
+            cache_counts[success["cache"]] += 1
+    # Unchanged stickers of an incremental build count as successful, in pack order.
+    successful_images = [info for info in processed_info if info["compact_name"] not in failed_names]
+    print(f"\nConversion took {schedule.format_seconds(time.perf_counter() - conversion_started)}.")
+    if settings["cache_dir"]:
+        print(f"\nConversion cache: {cache_counts['hit']} hit(s), {cache_counts['miss']} miss(es).")
+    if build_pipeline:
+        print(f"\n{build_pipeline.report()}")
 
     # 4. FINALIZATION PHASE
     if successful_images:
         print("\nConversion complete. Now generating Lua script...")
         successful_images = package_sticker_sounds(output_path, pack_name, successful_images)
-        create_lua_script(output_path, pack_name, successful_images)
+        create_lua_script(output_path, pack_name, successful_images, overwrite=args.incremental)
         print(f"\nSuccessfully created the '{pack_name}' sticker pack!")
     else:
         print("\nNo images were successfully converted. Addon creation aborted.")
 
+    if build_manifest is not None:
+        if not successful_images:
+            # Don't leave stickers that were removed from the folder in the Lua file.
+            create_lua_script(output_path, pack_name, [], overwrite=True)
+        # Failed stickers are left out so the next incremental build retries them.
+        for compact_name in failed_names:
+            build_manifest["stickers"].pop(compact_name, None)
+        manifest.save_manifest(addon_root, build_manifest)
+
     input("\nPress Enter to exit.")
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,344 @@
+"""Vectorized NumPy DXT (BC1/BC3) block compression."""
+
+import numpy as np
+
+DXT1_BLOCK_BYTES = 8
+DXT5_BLOCK_BYTES = 16
+
+# DXT1 with one bit alpha treats texels below this as transparent, matching the
+# 0.5 reference used by $alphatest.
+ONE_BIT_ALPHA_THRESHOLD = 128
+
+# Number of 4x4 blocks compressed per NumPy pass. One 512x512 frame is 16384
+# blocks, so batches of frames are processed a frame's worth at a time to keep
+# the temporary arrays small.
+BLOCKS_PER_CHUNK = 16384
+
+# Weights of endpoint 0 for the four colour indices of a 4-colour block.
+_COLOR_WEIGHTS = np.array([1.0, 0.0, 2.0 / 3.0, 1.0 / 3.0], dtype=np.float32)
+_BIT_SHIFTS_2 = (np.arange(16, dtype=np.uint32) * 2)
+_BIT_SHIFTS_3 = (np.arange(16, dtype=np.uint64) * 3)
+_POWER_ITERATIONS = 4
+# Position along the endpoint1 -> endpoint0 segment (in thirds) to colour index.
+_STEP_TO_INDEX = np.array([1, 3, 2, 0], dtype=np.uint32)
+# Same for 3-colour DXT1 blocks, where the segment is split in halves.
+_HALF_STEP_TO_INDEX = np.array([1, 2, 0], dtype=np.uint32)
+
+
+def to_blocks(rgba):
+    """
+    Split (..., H, W, 4) uint8 pixels into a (..., H/4, W/4, 16, 4) block tensor.
+    Surfaces smaller than 4x4 (the last mip levels) are padded by repeating edges.
+    """
+    rgba = np.asarray(rgba, dtype=np.uint8)
+    height, width = rgba.shape[-3:-1]
+    pad_h, pad_w = -height % 4, -width % 4
+    if pad_h or pad_w:
+        pad = [(0, 0)] * (rgba.ndim - 3) + [(0, pad_h), (0, pad_w), (0, 0)]
+        rgba = np.pad(rgba, pad, mode="edge")
+        height, width = height + pad_h, width + pad_w
+    lead = rgba.shape[:-3]
+    blocks = rgba.reshape(*lead, height // 4, 4, width // 4, 4, 4)
+    blocks = np.moveaxis(blocks, -4, -3)
+    return blocks.reshape(*lead, height // 4, width // 4, 16, 4)
+
+
+def from_blocks(blocks, height, width):
+    """Inverse of to_blocks, cropping any edge padding."""
+    blocks = np.asarray(blocks)
+    lead = blocks.shape[:-4]
+    block_rows, block_cols = blocks.shape[-4:-2]
+    pixels = blocks.reshape(*lead, block_rows, block_cols, 4, 4, 4)
+    pixels = np.moveaxis(pixels, -3, -4)
+    pixels = pixels.reshape(*lead, block_rows * 4, block_cols * 4, 4)
+    return pixels[..., :height, :width, :]
+
+
+def _quantize_565(colors):
+    """Round float RGB endpoints to RGB565, returning (packed uint16, expanded float RGB)."""
+    colors = np.clip(colors, 0.0, 255.0)
+    r = np.rint(colors[..., 0] * (31.0 / 255.0)).astype(np.uint16)
+    g = np.rint(colors[..., 1] * (63.0 / 255.0)).astype(np.uint16)
+    b = np.rint(colors[..., 2] * (31.0 / 255.0)).astype(np.uint16)
+    packed = (r << 11) | (g << 5) | b
+    return packed, _expand_565(packed)
+
+
+def _expand_565(packed):
+    packed = packed.astype(np.uint16)
+    r = (packed >> 11) & 0x1F
+    g = (packed >> 5) & 0x3F
+    b = packed & 0x1F
+    expanded = np.stack([(r << 3) | (r >> 2), (g << 2) | (g >> 4), (b << 3) | (b >> 2)], axis=-1)
+    return expanded.astype(np.float32)
+
+
+def _fit_color_endpoints(colors, weights):
+    """
+    Fit two endpoints per block along the principal axis of its (weighted) colours.
+    colors is (M, 16, 3) float32, weights is (M, 16) float32 with at least one
+    non-zero entry per block.
+    """
+    total = weights.sum(axis=1, keepdims=True)
+    mean = np.einsum("mp,mpi->mi", weights, colors) / total
+    centered = colors - mean[:, None, :]
+    covariance = np.einsum("mp,mpi,mpj->mij", weights, centered, centered)
+
+    # Power iteration for the dominant eigenvector, seeded with the channel spread.
+    axis = colors.max(axis=1) - colors.min(axis=1) + 1e-3
+    for _ in range(_POWER_ITERATIONS):
+        axis = np.einsum("mij,mj->mi", covariance, axis)
+        norm = np.linalg.norm(axis, axis=1, keepdims=True)
+        axis = np.where(norm > 1e-6, axis / np.maximum(norm, 1e-6), 1.0 / np.sqrt(3.0))
+
+    projection = np.einsum("mpi,mi->mp", centered, axis)
+    masked = weights > 0
+    low = np.where(masked, projection, np.inf).min(axis=1)
+    high = np.where(masked, projection, -np.inf).max(axis=1)
+    endpoint0 = mean + high[:, None] * axis
+    endpoint1 = mean + low[:, None] * axis
+    return endpoint0, endpoint1
+
+
+def _assign_color_indices(colors, expanded0, expanded1):
+    """
+    Pick the nearest of the four palette colours for every pixel by projecting
+    it onto the endpoint segment, which avoids a full palette distance search.
+    """
+    direction = expanded0 - expanded1
+    length = np.einsum("mi,mi->m", direction, direction)
+    offsets = colors - expanded1[:, None, :]
+    t = np.einsum("mpi,mi->mp", offsets, direction) / np.maximum(length, 1e-6)[:, None]
+    steps = np.clip(np.rint(t * 3.0), 0, 3).astype(np.intp)
+    return _STEP_TO_INDEX[steps]
+
+
+def _refine_endpoints(colors, weights, indices, endpoint0, endpoint1):
+    """One least-squares pass that re-solves both endpoints for the chosen indices."""
+    w0 = _COLOR_WEIGHTS[indices]
+    w1 = 1.0 - w0
+    alpha = w0 * weights
+    beta = w1 * weights
+    aa = (alpha * w0).sum(axis=1)
+    bb = (beta * w1).sum(axis=1)
+    ab = (alpha * w1).sum(axis=1)
+    ax = np.einsum("mp,mpi->mi", alpha, colors)
+    bx = np.einsum("mp,mpi->mi", beta, colors)
+    determinant = aa * bb - ab * ab
+    solvable = np.abs(determinant) > 1e-6
+    safe = np.where(solvable, determinant, 1.0)[:, None]
+    refined0 = (ax * bb[:, None] - bx * ab[:, None]) / safe
+    refined1 = (bx * aa[:, None] - ax * ab[:, None]) / safe
+    solvable = solvable[:, None]
+    return np.where(solvable, refined0, endpoint0), np.where(solvable, refined1, endpoint1)
+
+
+def _color_palette(expanded0, expanded1):
+    return np.stack([
+        expanded0,
+        expanded1,
+        np.floor((2.0 * expanded0 + expanded1) / 3.0),
+        np.floor((expanded0 + 2.0 * expanded1) / 3.0),
+    ], axis=1)
+
+
+def _encode_color_blocks(blocks, weights):
+    """
+    Encode the colour half of BC1/BC3 blocks in 4-colour mode.
+    Returns (color0, color1, packed 32-bit indices) for (M, 16, 4) uint8 blocks.
+    """
+    colors = blocks[..., :3].astype(np.float32)
+    endpoint0, endpoint1 = _fit_color_endpoints(colors, weights)
+    packed0, expanded0 = _quantize_565(endpoint0)
+    packed1, expanded1 = _quantize_565(endpoint1)
+    indices = _assign_color_indices(colors, expanded0, expanded1)
+
+    endpoint0, endpoint1 = _refine_endpoints(colors, weights, indices, endpoint0, endpoint1)
+    packed0, expanded0 = _quantize_565(endpoint0)
+    packed1, expanded1 = _quantize_565(endpoint1)
+    indices = _assign_color_indices(colors, expanded0, expanded1)
+
+    # 4-colour mode needs color0 > color1; swapping the endpoints swaps index
+    # pairs 0<->1 and 2<->3. Equal endpoints decode as a solid colour block.
+    swap = packed0 < packed1
+    packed0, packed1 = np.where(swap, packed1, packed0), np.where(swap, packed0, packed1)
+    indices = np.where(swap[:, None], indices ^ 1, indices)
+    indices = np.where((packed0 == packed1)[:, None], 0, indices)
+
+    packed_indices = (indices << _BIT_SHIFTS_2).sum(axis=1, dtype=np.uint32)
+    return packed0, packed1, packed_indices
+
+
+def _encode_three_color_blocks(blocks, transparent, packed0, packed1):
+    """
+    Re-encode blocks in DXT1's 3-colour + transparent mode, reusing endpoints
+    from the 4-colour fit. That mode needs color0 <= color1, so they are swapped.
+    """
+    packed0, packed1 = packed1, packed0
+    expanded0, expanded1 = _expand_565(packed0), _expand_565(packed1)
+    direction = expanded0 - expanded1
+    length = np.einsum("mi,mi->m", direction, direction)
+    offsets = blocks[..., :3].astype(np.float32) - expanded1[:, None, :]
+    t = np.einsum("mpi,mi->mp", offsets, direction) / np.maximum(length, 1e-6)[:, None]
+    steps = np.clip(np.rint(t * 2.0), 0, 2).astype(np.intp)
+    indices = np.where(transparent, 3, _HALF_STEP_TO_INDEX[steps])
+    packed_indices = (indices << _BIT_SHIFTS_2).sum(axis=1, dtype=np.uint32)
+    return packed0, packed1, packed_indices
+
+
+def _encode_alpha_blocks(alpha):
+    """Encode BC3 alpha blocks in 8-value mode. alpha is (M, 16) uint8."""
+    alpha0 = alpha.max(axis=1).astype(np.int32)
+    alpha1 = alpha.min(axis=1).astype(np.int32)
+    # Palette order for alpha0 > alpha1: a0, a1, then six interpolated values.
+    weight0 = np.array([7, 0, 6, 5, 4, 3, 2, 1], dtype=np.int32)
+    palette = (weight0 * alpha0[:, None] + (7 - weight0) * alpha1[:, None]) // 7
+    distances = np.abs(alpha.astype(np.int32)[:, :, None] - palette[:, None, :])
+    indices = distances.argmin(axis=-1).astype(np.uint64)
+    indices = np.where((alpha0 == alpha1)[:, None], 0, indices)
+    packed_indices = (indices << _BIT_SHIFTS_3).sum(axis=1, dtype=np.uint64)
+    return alpha0.astype(np.uint8), alpha1.astype(np.uint8), packed_indices
+
+
+def _color_weights(blocks):
+    """Ignore fully transparent pixels when fitting colours, unless the whole block is."""
+    visible = blocks[..., 3] > 0
+    visible |= ~visible.any(axis=1, keepdims=True)
+    return visible.astype(np.float32)
+
+
+def _compress_dxt5_chunk(blocks):
+    out = np.empty((blocks.shape[0], DXT5_BLOCK_BYTES), dtype=np.uint8)
+    alpha0, alpha1, alpha_indices = _encode_alpha_blocks(blocks[..., 3])
+    color0, color1, color_indices = _encode_color_blocks(blocks, _color_weights(blocks))
+    out[:, 0] = alpha0
+    out[:, 1] = alpha1
+    out[:, 2:8] = alpha_indices.astype("<u8").view(np.uint8).reshape(-1, 8)[:, :6]
+    out[:, 8:10] = color0.astype("<u2").view(np.uint8).reshape(-1, 2)
+    out[:, 10:12] = color1.astype("<u2").view(np.uint8).reshape(-1, 2)
+    out[:, 12:16] = color_indices.astype("<u4").view(np.uint8).reshape(-1, 4)
+    return out
+
+
+def _pack_color_blocks(color0, color1, color_indices):
+    out = np.empty((color0.shape[0], DXT1_BLOCK_BYTES), dtype=np.uint8)
+    out[:, 0:2] = color0.astype("<u2").view(np.uint8).reshape(-1, 2)
+    out[:, 2:4] = color1.astype("<u2").view(np.uint8).reshape(-1, 2)
+    out[:, 4:8] = color_indices.astype("<u4").view(np.uint8).reshape(-1, 4)
+    return out
+
+
+def _compress_dxt1_chunk(blocks):
+    weights = np.ones(blocks.shape[:2], dtype=np.float32)
+    return _pack_color_blocks(*_encode_color_blocks(blocks, weights))
+
+
+def _compress_dxt1_one_bit_alpha_chunk(blocks):
+    transparent = blocks[..., 3] < ONE_BIT_ALPHA_THRESHOLD
+    weights = ~transparent
+    weights |= ~weights.any(axis=1, keepdims=True)
+    color0, color1, color_indices = _encode_color_blocks(blocks, weights.astype(np.float32))
+
+    three_color = transparent.any(axis=1)
+    if three_color.any():
+        three0, three1, three_indices = _encode_three_color_blocks(
+            blocks[three_color], transparent[three_color], color0[three_color], color1[three_color]
+        )
+        color0[three_color] = three0
+        color1[three_color] = three1
+        color_indices[three_color] = three_indices
+    return _pack_color_blocks(color0, color1, color_indices)
+
+
+def _compress(rgba, encode_chunk, block_bytes):
+    rgba = np.asarray(rgba, dtype=np.uint8)
+    blocks = to_blocks(rgba)
+    lead = blocks.shape[:-2]
+    flat = blocks.reshape(-1, 16, 4)
+    out = np.empty((flat.shape[0], block_bytes), dtype=np.uint8)
+    for start in range(0, flat.shape[0], BLOCKS_PER_CHUNK):
+        stop = start + BLOCKS_PER_CHUNK
+        out[start:stop] = encode_chunk(flat[start:stop])
+    frames = lead[:-2]
+    return out.reshape(*frames, -1)
+
+
+def compress_dxt1(rgba, one_bit_alpha=False):
+    """
+    Compress RGBA pixels to DXT1/BC1, ignoring alpha unless one_bit_alpha is set,
+    in which case texels below ONE_BIT_ALPHA_THRESHOLD become transparent.
+    Takes the same (H, W, 4) or (N, H, W, 4) input as compress_dxt5.
+    """
+    encode_chunk = _compress_dxt1_one_bit_alpha_chunk if one_bit_alpha else _compress_dxt1_chunk
+    return _compress(rgba, encode_chunk, DXT1_BLOCK_BYTES)
+
+
+def compress_dxt1_one_bit_alpha(rgba):
+    return compress_dxt1(rgba, one_bit_alpha=True)
+
+
+def compress_dxt5(rgba):
+    """
+    Compress RGBA pixels to DXT5/BC3.
+    Accepts one (H, W, 4) surface or a batch of frames shaped (N, H, W, 4) and
+    returns the block data as a uint8 array shaped (bytes,) or (N, bytes).
+    """
+    return _compress(rgba, _compress_dxt5_chunk, DXT5_BLOCK_BYTES)
+
+
+def _decode_color_blocks(data):
+    color0 = data[:, 0:2].copy().view("<u2")[:, 0]
+    color1 = data[:, 2:4].copy().view("<u2")[:, 0]
+    palette = _color_palette(_expand_565(color0), _expand_565(color1))
+    packed = data[:, 4:8].copy().view("<u4")[:, 0]
+    indices = (packed[:, None] >> _BIT_SHIFTS_2) & 0x3
+    return np.take_along_axis(palette, indices[..., None].astype(np.intp), axis=1)
+
+
+def decompress_dxt1(data, width, height):
+    """Decode DXT1/BC1 block data, including 3-colour + transparent blocks."""
+    data = np.frombuffer(bytes(data), dtype=np.uint8).reshape(-1, DXT1_BLOCK_BYTES)
+    color0 = data[:, 0:2].copy().view("<u2")[:, 0]
+    color1 = data[:, 2:4].copy().view("<u2")[:, 0]
+    expanded0, expanded1 = _expand_565(color0), _expand_565(color1)
+    four = _color_palette(expanded0, expanded1)
+    three = np.stack([
+        expanded0,
+        expanded1,
+        np.floor((expanded0 + expanded1) / 2.0),
+        np.zeros_like(expanded0),
+    ], axis=1)
+    three_color = color0 <= color1
+    palette = np.where(three_color[:, None, None], three, four)
+    alpha_palette = np.full((data.shape[0], 4), 255, dtype=np.float32)
+    alpha_palette[three_color, 3] = 0
+    palette = np.concatenate([palette, alpha_palette[..., None]], axis=-1)
+
+    packed = data[:, 4:8].copy().view("<u4")[:, 0]
+    indices = ((packed[:, None] >> _BIT_SHIFTS_2) & 0x3).astype(np.intp)
+    blocks = np.take_along_axis(palette, indices[..., None], axis=1).astype(np.uint8)
+    blocks = blocks.reshape((height + 3) // 4, (width + 3) // 4, 16, 4)
+    return from_blocks(blocks, height, width)
+
+
+def decompress_dxt5(data, width, height):
+    """Decode DXT5/BC3 block data back into an (H, W, 4) uint8 array."""
+    data = np.frombuffer(bytes(data), dtype=np.uint8).reshape(-1, DXT5_BLOCK_BYTES)
+    alpha0 = data[:, 0].astype(np.int32)
+    alpha1 = data[:, 1].astype(np.int32)
+    weight0 = np.array([7, 0, 6, 5, 4, 3, 2, 1], dtype=np.int32)
+    eight = (weight0 * alpha0[:, None] + (7 - weight0) * alpha1[:, None]) // 7
+    weight0_six = np.array([5, 0, 4, 3, 2, 1], dtype=np.int32)
+    six = (weight0_six * alpha0[:, None] + (5 - weight0_six) * alpha1[:, None]) // 5
+    six = np.concatenate([six, np.zeros_like(six[:, :1]), np.full_like(six[:, :1], 255)], axis=1)
+    alpha_palette = np.where((alpha0 > alpha1)[:, None], eight, six)
+    alpha_bits = np.zeros((data.shape[0], 8), dtype=np.uint8)
+    alpha_bits[:, :6] = data[:, 2:8]
+    packed = alpha_bits.view("<u8")[:, 0]
+    alpha_indices = ((packed[:, None] >> _BIT_SHIFTS_3) & 0x7).astype(np.intp)
+    alpha = np.take_along_axis(alpha_palette, alpha_indices, axis=1)
+
+    colors = _decode_color_blocks(data[:, 8:16])
+    blocks = np.concatenate([colors, alpha[..., None]], axis=-1).astype(np.uint8)
+    blocks = blocks.reshape((height + 3) // 4, (width + 3) // 4, 16, 4)
+    return from_blocks(blocks, height, width)
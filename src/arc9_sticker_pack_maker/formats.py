@@ -0,0 +1,99 @@
+"""Per-sticker texture format selection."""
+
+import numpy as np
+
+from vtflib.enums import ImageFlag, ImageFormat
+
+# "auto" picks the smallest block compressed format that still renders the
+# sticker correctly, "lossless" the smallest uncompressed one and "dxt5" keeps
+# the old behaviour of always using DXT5.
+TEXTURE_FORMAT_MODES = ("auto", "lossless", "dxt5")
+
+# Materials use $alphatest, so alpha is effectively binary in game. Stickers
+# whose visible texels are at most this fraction semi-transparent keep their
+# look with one bit alpha; more than that (soft glows, shadows) keeps DXT5 so
+# the mip chain can still fade alpha out smoothly.
+MAX_PARTIAL_ALPHA_FRACTION = 0.05
+# Largest channel difference still treated as grey, to absorb JPEG noise.
+GRAYSCALE_TOLERANCE = 2
+
+FORMAT_FLAGS = {
+    ImageFormat.ImageFormatDXT1: 0,
+    ImageFormat.ImageFormatDXT1OneBitAlpha: ImageFlag.ImageFlagOneBitAlpha,
+    ImageFormat.ImageFormatDXT5: ImageFlag.ImageFlagEightBitAlpha,
+    ImageFormat.ImageFormatI8: 0,
+    ImageFormat.ImageFormatIA88: ImageFlag.ImageFlagEightBitAlpha,
+    ImageFormat.ImageFormatRGB888: 0,
+    ImageFormat.ImageFormatRGBA8888: ImageFlag.ImageFlagEightBitAlpha,
+}
+
+FORMAT_NAMES = {
+    ImageFormat.ImageFormatDXT1: "DXT1",
+    ImageFormat.ImageFormatDXT1OneBitAlpha: "DXT1 (1-bit alpha)",
+    ImageFormat.ImageFormatDXT5: "DXT5",
+    ImageFormat.ImageFormatI8: "I8",
+    ImageFormat.ImageFormatIA88: "IA88",
+    ImageFormat.ImageFormatRGB888: "RGB888",
+    ImageFormat.ImageFormatRGBA8888: "RGBA8888",
+}
+
+
+def analyze_texture(rgba):
+    """
+    Describe the alpha and colour content of (H, W, 4) or (N, H, W, 4) RGBA pixels.
+    Returns a dict with "has_alpha", "binary_alpha" and "grayscale", plus the
+    texel counts they were derived from so analyses can be merged.
+    """
+    rgba = np.asarray(rgba)
+    histogram = np.bincount(rgba[..., 3].ravel(), minlength=256)
+
+    opaque_pixels = rgba[rgba[..., 3] > 0][:, :3].astype(np.int16)
+    if opaque_pixels.size:
+        spread = opaque_pixels.max(axis=1) - opaque_pixels.min(axis=1)
+        grayscale = bool(spread.max() <= GRAYSCALE_TOLERANCE)
+    else:
+        grayscale = True
+    return _build_analysis(
+        int(histogram[:255].sum()), int(histogram[1:].sum()), int(histogram[1:255].sum()), grayscale
+    )
+
+
+def merge_texture_analyses(first, second):
+    """Combine the analyses of two parts of a texture, e.g. frames of an animation."""
+    return _build_analysis(
+        first["translucent_texels"] + second["translucent_texels"],
+        first["visible_texels"] + second["visible_texels"],
+        first["partial_alpha_texels"] + second["partial_alpha_texels"],
+        first["grayscale"] and second["grayscale"],
+    )
+
+
+def _build_analysis(translucent, visible, partial, grayscale):
+    return {
+        "has_alpha": translucent > 0,
+        "binary_alpha": partial <= MAX_PARTIAL_ALPHA_FRACTION * max(visible, 1),
+        "grayscale": grayscale,
+        "translucent_texels": translucent,
+        "visible_texels": visible,
+        "partial_alpha_texels": partial,
+    }
+
+
+def select_texture_format(analysis, mode="auto"):
+    """Pick the VTF image format for an analyzed sticker under the given mode."""
+    if mode not in TEXTURE_FORMAT_MODES:
+        raise ValueError(
+            f"Unknown texture format mode '{mode}'. Choose one of: {', '.join(TEXTURE_FORMAT_MODES)}."
+        )
+    has_alpha = analysis["has_alpha"]
+    if mode == "dxt5":
+        return ImageFormat.ImageFormatDXT5
+    if mode == "lossless":
+        if analysis["grayscale"]:
+            return ImageFormat.ImageFormatIA88 if has_alpha else ImageFormat.ImageFormatI8
+        return ImageFormat.ImageFormatRGBA8888 if has_alpha else ImageFormat.ImageFormatRGB888
+    if not has_alpha:
+        return ImageFormat.ImageFormatDXT1
+    if analysis["binary_alpha"]:
+        return ImageFormat.ImageFormatDXT1OneBitAlpha
+    return ImageFormat.ImageFormatDXT5
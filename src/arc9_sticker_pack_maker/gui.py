@@ -7,6 +7,7 @@ import json
 import re
 import urllib.error
 import urllib.request
+from contextlib import closing
 from pathlib import Path
 
 # --- Determine the base path for bundled assets and modules ---
@@ -115,11 +116,12 @@ class Worker(QObject):
     error = Signal(str)
     close = Signal()
 
-    def __init__(self, output_dir, pack_name, processed_info):
+    def __init__(self, output_dir, pack_name, processed_info, jobs=None):
         super().__init__()
         self.output_dir = output_dir
         self.pack_name = pack_name
         self.processed_info = processed_info
+        self.jobs = jobs
         self.is_running = True
 
     def run(self):
@@ -132,13 +134,22 @@ class Worker(QObject):
 
             successful_images = []
             total = len(self.processed_info)
-            for i, info in enumerate(self.processed_info):
-                if not self.is_running:
-                    break
-                self.progress.emit(i, f"Processing '{info['original_name']}'...", info['path'])
-                if core.process_image_to_vtf(self.output_dir, info, self.pack_name, info["compact_name"], sticker_dir):
-                    successful_images.append(info)
-            
+            if total:
+                first = self.processed_info[0]
+                self.progress.emit(0, f"Processing '{first['original_name']}'...", first['path'])
+            conversions = core.convert_images(
+                self.output_dir, self.pack_name, self.processed_info, sticker_dir, jobs=self.jobs
+            )
+            with closing(conversions):
+                for i, (info, success) in enumerate(conversions):
+                    if not self.is_running:
+                        break
+                    if success:
+                        successful_images.append(info)
+                        self.progress.emit(i + 1, f"Converted '{info['original_name']}'", info['path'])
+                    else:
+                        self.progress.emit(i + 1, f"Failed '{info['original_name']}'", info['path'])
+
             if self.is_running:
                 if successful_images:
                     self.progress.emit(total, "Generating Lua script...", "")
@@ -374,11 +385,13 @@ class StickerCreatorGUI(QMainWindow):
         self._subfolder_default_text = "" # Initialize here
         self.remember_paths_enabled = True
         self.carry_subfolder_enabled = True
+        self.scan_subfolders_enabled = False
         self.autoplay_gifs_enabled = True
         self.thumbnail_size_name = "Medium"
         self.reduced_animations_enabled = False
         self.output_tree_enabled = True
         self.check_updates_on_startup_enabled = True
+        self.conversion_jobs = 0
         self.update_check_thread = None
         self.update_check_worker = None
         self._startup_update_check_started = False
@@ -475,18 +488,22 @@ class StickerCreatorGUI(QMainWindow):
         self._subfolder_default_text = self.settings.value("subfolder_default_text", "", type=str)
         self.remember_paths_enabled = self.settings.value("remember_paths_enabled", True, type=bool)
         self.carry_subfolder_enabled = self.settings.value("carry_subfolder_enabled", True, type=bool)
+        self.scan_subfolders_enabled = self.settings.value("scan_subfolders_enabled", False, type=bool)
         self.autoplay_gifs_enabled = self.settings.value("autoplay_gifs_enabled", True, type=bool)
         self.thumbnail_size_name = self.settings.value("thumbnail_size_name", "Medium", type=str)
         self.reduced_animations_enabled = self.settings.value("reduced_animations_enabled", False, type=bool)
         self.output_tree_enabled = self.settings.value("output_tree_enabled", True, type=bool)
         self.check_updates_on_startup_enabled = self.settings.value("check_updates_on_startup_enabled", True, type=bool)
+        self.conversion_jobs = self.settings.value("conversion_jobs", 0, type=int)
 
         self.remember_paths_checkbox.setChecked(self.remember_paths_enabled)
         self.carry_subfolder_checkbox.setChecked(self.carry_subfolder_enabled)
+        self.scan_subfolders_checkbox.setChecked(self.scan_subfolders_enabled)
         self.autoplay_gifs_checkbox.setChecked(self.autoplay_gifs_enabled)
         self.output_tree_checkbox.setChecked(self.output_tree_enabled)
         self.check_updates_checkbox.setChecked(self.check_updates_on_startup_enabled)
         self.thumbnail_size_combo.setCurrentText(self.thumbnail_size_name)
+        self.conversion_jobs_combo.setCurrentText(self.conversion_jobs_label(self.conversion_jobs))
         self.reduced_animations_checkbox.setChecked(self.reduced_animations_enabled)
         self.apply_thumbnail_size(self.thumbnail_size_name)
         self.apply_output_tree_visibility()
@@ -512,11 +529,13 @@ class StickerCreatorGUI(QMainWindow):
         self.settings.setValue("subfolder_default_text", self._subfolder_default_text)
         self.settings.setValue("remember_paths_enabled", self.remember_paths_checkbox.isChecked())
         self.settings.setValue("carry_subfolder_enabled", self.carry_subfolder_checkbox.isChecked())
+        self.settings.setValue("scan_subfolders_enabled", self.scan_subfolders_checkbox.isChecked())
         self.settings.setValue("autoplay_gifs_enabled", self.autoplay_gifs_checkbox.isChecked())
         self.settings.setValue("thumbnail_size_name", self.thumbnail_size_combo.currentText())
         self.settings.setValue("reduced_animations_enabled", self.reduced_animations_checkbox.isChecked())
         self.settings.setValue("output_tree_enabled", self.output_tree_checkbox.isChecked())
         self.settings.setValue("check_updates_on_startup_enabled", self.check_updates_checkbox.isChecked())
+        self.settings.setValue("conversion_jobs", self.conversion_jobs)
 
     def toggle_background(self, state):
         if hasattr(self, 'scroll_anim') and self.scroll_anim:
@@ -802,6 +821,12 @@ class StickerCreatorGUI(QMainWindow):
             "Use the last entered subfolder as the default for new stickers.",
             self.on_carry_subfolder_changed,
         )
+        self.scan_subfolders_checkbox = self.create_settings_toggle_row(
+            workflow_layout,
+            "Import nested folders",
+            "Also load images from folders inside the image folder and use each folder as their subfolder.",
+            self.on_scan_subfolders_changed,
+        )
         self.autoplay_gifs_checkbox = self.create_settings_toggle_row(
             workflow_layout,
             "Autoplay GIF previews",
@@ -860,6 +885,29 @@ class StickerCreatorGUI(QMainWindow):
         thumbnail_layout.addWidget(self.thumbnail_size_combo)
         workflow_layout.addWidget(thumbnail_row)
 
+        jobs_row = QFrame()
+        jobs_row.setObjectName("settingsRow")
+        jobs_layout = QHBoxLayout(jobs_row)
+        jobs_layout.setContentsMargins(0, 0, 0, 0)
+        jobs_text_layout = QVBoxLayout()
+        jobs_text_layout.setSpacing(2)
+        jobs_title = QLabel("Conversion workers")
+        jobs_title.setObjectName("settingsLabel")
+        jobs_caption = QLabel("How many stickers to convert at once. Auto uses every CPU core.")
+        jobs_caption.setObjectName("settingsCaption")
+        jobs_text_layout.addWidget(jobs_title)
+        jobs_text_layout.addWidget(jobs_caption)
+        jobs_layout.addLayout(jobs_text_layout)
+        jobs_layout.addStretch()
+        self.conversion_jobs_combo = QComboBox()
+        self.conversion_jobs_combo.addItems(
+            [self.conversion_jobs_label(0)]
+            + [self.conversion_jobs_label(count) for count in range(1, (os.cpu_count() or 1) + 1)]
+        )
+        self.conversion_jobs_combo.currentTextChanged.connect(self.on_conversion_jobs_changed)
+        jobs_layout.addWidget(self.conversion_jobs_combo)
+        workflow_layout.addWidget(jobs_row)
+
         layout.addWidget(workflow_frame)
         layout.addStretch()
 
@@ -895,6 +943,10 @@ class StickerCreatorGUI(QMainWindow):
         self.carry_subfolder_enabled = bool(state)
         self.save_settings()
 
+    def on_scan_subfolders_changed(self, state):
+        self.scan_subfolders_enabled = bool(state)
+        self.save_settings()
+
     def on_autoplay_gifs_changed(self, state):
         self.autoplay_gifs_enabled = bool(state)
         for cell in getattr(self, "thumbnail_cells", []):
@@ -920,6 +972,13 @@ class StickerCreatorGUI(QMainWindow):
             self.show_current_image()
         self.save_settings()
 
+    def conversion_jobs_label(self, jobs):
+        return "Auto" if not jobs else str(jobs)
+
+    def on_conversion_jobs_changed(self, label):
+        self.conversion_jobs = 0 if label == "Auto" else int(label)
+        self.save_settings()
+
     def on_reduced_animations_changed(self, state):
         self.reduced_animations_enabled = bool(state)
         if hasattr(self, "scroll_anim") and self.scroll_anim:
@@ -1648,15 +1707,8 @@ class StickerCreatorGUI(QMainWindow):
         return filenames
 
     def preview_compact_names_by_index(self, states):
-        compact_names = {}
-        for index, state in enumerate(states):
-            print_name = state.get("print_name", "")
-            compact_input = state.get("compact_name_input", "")
-            compact_name = (
-                core.sanitize_for_filename(compact_input, strict=False)
-                if compact_input
-                else core.sanitize_for_filename(print_name, strict=True)
-            )
+        compact_names = self.allocate_compact_names(states)
+        for index, compact_name in compact_names.items():
             compact_names[index] = compact_name or f"sticker_{index + 1}"
         return compact_names
 
@@ -1712,17 +1764,8 @@ class StickerCreatorGUI(QMainWindow):
 
         # Scan for images with progress feedback
         try:
-            images_to_process = []
-            for entry in core.iter_sorted_files(image_folder):
-                # Use a more reliable method to check for valid images
-                pixmap = QPixmap(entry.path)
-                if pixmap.isNull():
-                    continue  # Skip files that Qt can't read
-
-                images_to_process.append({
-                    "path": entry.path,
-                    "original_name": os.path.splitext(entry.name)[0],
-                })
+            # Probe results are cached in the discovery index, a rescan only stats the files.
+            images_to_process = core.discover_images(image_folder, recursive=self.scan_subfolders_enabled)
         except PermissionError:
             QMessageBox.critical(self, "Access Error", f"Cannot access folder:\n{image_folder}\n\nPlease check folder permissions.")
             return
@@ -1790,7 +1833,9 @@ class StickerCreatorGUI(QMainWindow):
             "print_name": image_info["original_name"].replace('_', ' ').title(),
             "compact_name_input": "",
             "description": "",
-            "subfolder": self._subfolder_default_text if self.carry_subfolder_enabled else "",
+            "subfolder": image_info.get("subfolder") or (
+                self._subfolder_default_text if self.carry_subfolder_enabled else ""
+            ),
             "install_sound": "",
             "uninstall_sound": "",
             "impact_sound": "",
@@ -1905,16 +1950,15 @@ class StickerCreatorGUI(QMainWindow):
             self.print_name_edit.selectAll()
             return
 
+        # Generated names are made unique across subfolders, only typed ones can clash.
         user_compact_name = self.compact_name_edit.text().strip()
-        if user_compact_name:
-             compact_name = core.sanitize_for_filename(user_compact_name, strict=False)
-        else:
-             compact_name = core.sanitize_for_filename(print_name, strict=True)
-
-        existing_names = self.compact_names_by_index()
-        if compact_name in {
-            name for index, name in existing_names.items() if index != idx
-        }:
+        compact_name = core.sanitize_for_filename(user_compact_name, strict=False)
+        typed_names = {
+            core.sanitize_for_filename(state["compact_name_input"], strict=False)
+            for index, state in enumerate(self.processing_data["sticker_states"])
+            if state and state["compact_name_input"] and index != idx
+        }
+        if user_compact_name and compact_name in typed_names:
             msg_box = QMessageBox(self)
             msg_box.setWindowTitle("Duplicate Material Name")
             msg_box.setText(
@@ -1930,12 +1974,8 @@ class StickerCreatorGUI(QMainWindow):
                 msg_box.setIcon(QMessageBox.Warning)
             
             msg_box.exec()
-            if user_compact_name:
-                self.compact_name_edit.setFocus()
-                self.compact_name_edit.selectAll()
-            else:
-                self.print_name_edit.setFocus()
-                self.print_name_edit.selectAll()
+            self.compact_name_edit.setFocus()
+            self.compact_name_edit.selectAll()
             return
 
         self.processing_data["sticker_states"][idx] = self.current_form_state()
@@ -1948,18 +1988,30 @@ class StickerCreatorGUI(QMainWindow):
         self.processing_data["current_index"] = idx + 1
         self.show_current_image()
 
-    def compact_names_by_index(self):
+    def allocate_compact_names(self, states):
+        """Typed material names are kept, generated ones are made unique around them."""
         compact_names = {}
-        for index, image_info in enumerate(self.processing_data["images"]):
-            state = self.processing_data["sticker_states"][index] or self.default_state_for_image(image_info)
-            print_name = state["print_name"]
-            compact_input = state["compact_name_input"]
-            compact_names[index] = (
-                core.sanitize_for_filename(compact_input, strict=False)
-                if compact_input
-                else core.sanitize_for_filename(print_name, strict=True)
+        for index, state in enumerate(states):
+            compact_input = state.get("compact_name_input", "")
+            if compact_input:
+                compact_names[index] = core.sanitize_for_filename(compact_input, strict=False)
+        used_names = set(compact_names.values())
+        for index, state in enumerate(states):
+            if index in compact_names:
+                continue
+            compact_name = core.unique_compact_name(
+                state.get("print_name", ""), state.get("subfolder", ""), used_names
             )
-        return compact_names
+            compact_names[index] = compact_name
+            used_names.add(compact_name)
+        return dict(sorted(compact_names.items()))
+
+    def compact_names_by_index(self):
+        states = [
+            self.processing_data["sticker_states"][index] or self.default_state_for_image(image_info)
+            for index, image_info in enumerate(self.processing_data["images"])
+        ]
+        return self.allocate_compact_names(states)
 
     def build_processed_info(self):
         processed_info = []
@@ -1981,7 +2033,6 @@ class StickerCreatorGUI(QMainWindow):
                     state.get("shoot_silenced_outdoor_sounds", ""),
                 ),
                 "dryfire_sounds": state.get("dryfire_sounds", ""),
-                "type": "animated" if image_info["path"].lower().endswith('.gif') else "static",
             })
         return processed_info
 
@@ -1996,7 +2047,8 @@ class StickerCreatorGUI(QMainWindow):
         self.worker = Worker(
             self.processing_data["output_dir"],
             self.processing_data["pack_name"],
-            self.processing_data["processed_info"]
+            self.processing_data["processed_info"],
+            jobs=self.conversion_jobs,
         )
         self.worker_thread = QThread()
         self.worker.moveToThread(self.worker_thread)
@@ -0,0 +1,118 @@
+"""Persistent SQLite index of probed images, so rescanning a large folder only stats its files."""
+
+import json
+import os
+import sqlite3
+import sys
+
+from arc9_sticker_pack_maker import cache, probe
+
+# Bump whenever the stored probe record changes shape.
+INDEX_SCHEMA_VERSION = 2
+INDEX_FILENAME = "discovery_index.sqlite3"
+
+
+def default_index_path():
+    """Per-user cache location of the discovery index."""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "arc9_sticker_pack_maker", INDEX_FILENAME)
+
+
+class DiscoveryIndex:
+    """
+    Probe records (see probe.probe_image) per file, keyed by path and valid while
+    the file's size, mtime and inode are unchanged. Files that are not images are
+    remembered too, so they are not reopened. A SHA-256 content hash is only
+    computed when asked for (see content_hash) and then kept with the record.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or default_index_path()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._db = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            if self._db.execute("PRAGMA user_version").fetchone()[0] != INDEX_SCHEMA_VERSION:
+                self._db.execute("DROP TABLE IF EXISTS files")
+                self._db.execute(f"PRAGMA user_version = {INDEX_SCHEMA_VERSION}")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "path TEXT PRIMARY KEY, folder TEXT NOT NULL, size INTEGER NOT NULL,"
+                " mtime_ns INTEGER NOT NULL, inode INTEGER NOT NULL, record TEXT, content_hash TEXT)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS files_folder ON files (folder)")
+            self._db.commit()
+        except sqlite3.Error:
+            self._db.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def probe(self, entry):
+        """
+        Return the probe record of an os.DirEntry, or None for files that are not
+        images. Only new or changed files are opened, and only their headers.
+        """
+        path = os.path.abspath(entry.path)
+        stat = entry.stat()
+        inode = entry.inode()
+        row = self._db.execute(
+            "SELECT record FROM files WHERE path = ? AND size = ? AND mtime_ns = ? AND inode = ?",
+            (path, stat.st_size, stat.st_mtime_ns, inode),
+        ).fetchone()
+        if row:
+            return json.loads(row[0]) if row[0] else None
+
+        record = probe.probe_image(entry.path)
+        self._db.execute(
+            "INSERT OR REPLACE INTO files (path, folder, size, mtime_ns, inode, record) VALUES (?, ?, ?, ?, ?, ?)",
+            (path, os.path.dirname(path), stat.st_size, stat.st_mtime_ns, inode,
+             json.dumps(record) if record is not None else None),
+        )
+        return record
+
+    def content_hash(self, path):
+        """
+        SHA-256 hex digest of a file's content. It is hashed on the first request
+        and remembered while the file is unchanged and its probe record is kept.
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        key = (path, stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        row = self._db.execute(
+            "SELECT content_hash FROM files WHERE path = ? AND size = ? AND mtime_ns = ? AND inode = ?", key,
+        ).fetchone()
+        if row and row[0]:
+            return row[0]
+        content_hash = cache.hash_file(path).hexdigest()
+        if row:
+            self._db.execute(
+                "UPDATE files SET content_hash = ? WHERE path = ? AND size = ? AND mtime_ns = ? AND inode = ?",
+                (content_hash,) + key,
+            )
+        return content_hash
+
+    def prune(self, folder_path, present_paths):
+        """Forget files of a folder that are no longer in present_paths."""
+        folder = os.path.abspath(folder_path)
+        present = {os.path.abspath(path) for path in present_paths}
+        stale = [
+            (path,) for (path,) in self._db.execute("SELECT path FROM files WHERE folder = ?", (folder,))
+            if path not in present
+        ]
+        self._db.executemany("DELETE FROM files WHERE path = ?", stale)
+
+    def close(self):
+        """Commit what was probed and close the database."""
+        if self._db is not None:
+            self._db.commit()
+            self._db.close()
+            self._db = None
@@ -0,0 +1,83 @@
+"""Build manifest that lets a pack be rebuilt incrementally."""
+
+import json
+import os
+import shutil
+import tempfile
+
+from arc9_sticker_pack_maker import cache
+
+MANIFEST_FILENAME = ".spm_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def new_manifest():
+    return {"version": MANIFEST_VERSION, "stickers": {}}
+
+
+def load_manifest(addon_root):
+    """Read the manifest of the previous build, or an empty one if there is none."""
+    try:
+        with open(os.path.join(addon_root, MANIFEST_FILENAME), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return new_manifest()
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return new_manifest()
+    return manifest
+
+
+def save_manifest(addon_root, manifest):
+    """Atomically write the manifest into the addon folder."""
+    fd, temp_path = tempfile.mkstemp(dir=addon_root, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(temp_path, os.path.join(addon_root, MANIFEST_FILENAME))
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def make_entry(source_path, settings, outputs, previous=None, hash_source=None):
+    """
+    Describe one sticker of this build. The hash of the previous entry is reused
+    when the file's size and modification time have not changed, otherwise the
+    file is hashed with hash_source (e.g. the discovery index's content_hash,
+    which remembers it) or read here.
+    """
+    stat = os.stat(source_path)
+    if previous and previous.get("size") == stat.st_size and previous.get("mtime_ns") == stat.st_mtime_ns:
+        source_hash = previous["source_hash"]
+    elif hash_source is not None:
+        source_hash = hash_source(source_path)
+    else:
+        source_hash = cache.hash_file(source_path).hexdigest()
+    return {
+        "source": source_path,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "source_hash": source_hash,
+        "settings": settings,
+        "outputs": outputs,
+    }
+
+
+def is_up_to_date(addon_root, entry, previous):
+    """True when the previous build produced exactly this sticker and its outputs still exist."""
+    if not previous:
+        return False
+    if any(previous.get(key) != entry[key] for key in ("source_hash", "settings", "outputs")):
+        return False
+    return all(os.path.isfile(os.path.join(addon_root, path)) for path in entry["outputs"])
+
+
+def remove_outputs(addon_root, entry):
+    """Delete the files and folders a previous build recorded for a sticker."""
+    for relative_path in entry.get("outputs", []):
+        path = os.path.join(addon_root, relative_path)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.lexists(path):
+            os.remove(path)
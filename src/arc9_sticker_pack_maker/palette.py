@@ -0,0 +1,48 @@
+"""Fast RGBA expansion of paletted (P mode) animation frames."""
+
+import numpy as np
+
+
+class PaletteExpander:
+    """
+    Expands P mode frames to RGBA with one NumPy gather per frame.
+    The 256 entry palette to RGBA lookup table, transparency included, is only
+    rebuilt when a frame brings a different palette, and every frame is written
+    into the same (H, W, 4) buffer, so each result is only valid until the next
+    call to expand().
+    """
+
+    def __init__(self):
+        self._key = None
+        self._table = None
+        self._buffer = None
+
+    def lookup_table(self, frame):
+        """Return the (256, 4) RGBA table of a P mode frame, reusing the previous one if unchanged."""
+        palette = frame.getpalette("RGB") or []
+        transparency = frame.info.get("transparency")
+        key = (bytes(palette), transparency)
+        if key != self._key:
+            table = np.zeros((256, 4), dtype=np.uint8)
+            colors = np.asarray(palette[:768], dtype=np.uint8).reshape(-1, 3)
+            table[:len(colors), :3] = colors
+            table[:, 3] = 255
+            if isinstance(transparency, int):
+                table[transparency, 3] = 0
+            elif isinstance(transparency, bytes):
+                # Per entry alpha, as in the tRNS chunk of a paletted PNG.
+                alpha = np.frombuffer(transparency[:256], dtype=np.uint8)
+                table[:len(alpha), 3] = alpha
+            self._key = key
+            self._table = table
+        return self._table
+
+    def expand(self, frame):
+        """Return the RGBA pixels of a P mode frame as an (H, W, 4) view of the reused buffer."""
+        table = self.lookup_table(frame)
+        indices = np.asarray(frame)
+        shape = indices.shape + (4,)
+        if self._buffer is None or self._buffer.shape != shape:
+            self._buffer = np.empty(shape, dtype=np.uint8)
+        np.take(table, indices, axis=0, out=self._buffer)
+        return self._buffer
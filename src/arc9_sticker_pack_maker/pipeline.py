@@ -0,0 +1,204 @@
+"""Stages joined by queues bounded in bytes, with occupancy statistics to find the bottleneck."""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+DEFAULT_QUEUE_BYTES = 256 * 1024 * 1024
+_MIB = 1024 * 1024
+
+# Returned by ByteBoundedQueue.get once the queue is closed and drained.
+DONE = object()
+
+
+class PipelineAborted(Exception):
+    """Raised in every stage once another stage failed or the consumer stopped."""
+
+
+class ByteBoundedQueue:
+    """
+    FIFO queue limited by the total size in bytes of the items in it, and
+    optionally by their number. A put blocks while the item does not fit, except
+    into an empty queue, so a single item larger than the limit still passes.
+    """
+
+    def __init__(self, name, max_bytes, max_items=None):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self._cond = threading.Condition()
+        self._items = deque()
+        self._closed = False
+        self._aborted = False
+        self.bytes = 0
+        self.peak_bytes = 0
+        # Seconds producers waited for room and consumers waited for items.
+        self.put_wait = 0.0
+        self.get_wait = 0.0
+        self._byte_seconds = 0.0
+        self._started = self._last_change = time.perf_counter()
+
+    def _has_room(self, nbytes):
+        if not self._items:
+            return True
+        if self.max_items is not None and len(self._items) >= self.max_items:
+            return False
+        return self.bytes + nbytes <= self.max_bytes
+
+    def _account(self):
+        now = time.perf_counter()
+        self._byte_seconds += self.bytes * (now - self._last_change)
+        self._last_change = now
+
+    def put(self, item, nbytes=0):
+        """Append an item that holds nbytes of memory, waiting for room."""
+        with self._cond:
+            if not self._has_room(nbytes) and not self._aborted:
+                started = time.perf_counter()
+                self._cond.wait_for(lambda: self._aborted or self._has_room(nbytes))
+                self.put_wait += time.perf_counter() - started
+            if self._aborted:
+                raise PipelineAborted(self.name)
+            self._account()
+            self._items.append((item, nbytes))
+            self.bytes += nbytes
+            self.peak_bytes = max(self.peak_bytes, self.bytes)
+            self._cond.notify_all()
+
+    def get(self):
+        """Remove and return the oldest item, or DONE once the queue is closed and empty."""
+        with self._cond:
+            if not self._items and not self._closed and not self._aborted:
+                started = time.perf_counter()
+                self._cond.wait_for(lambda: self._items or self._closed or self._aborted)
+                self.get_wait += time.perf_counter() - started
+            if self._aborted:
+                raise PipelineAborted(self.name)
+            if not self._items:
+                return DONE
+            self._account()
+            item, nbytes = self._items.popleft()
+            self.bytes -= nbytes
+            self._cond.notify_all()
+            return item
+
+    def close(self):
+        """Mark the end of the input, consumers get DONE after the last item."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def abort(self):
+        """Drop every item and wake all waiting stages with PipelineAborted."""
+        with self._cond:
+            self._aborted = True
+            self._items.clear()
+            self.bytes = 0
+            self._cond.notify_all()
+
+    def mean_bytes(self):
+        """Average number of bytes held since the queue was created."""
+        with self._cond:
+            self._account()
+            elapsed = self._last_change - self._started
+            return self._byte_seconds / elapsed if elapsed > 0 else 0.0
+
+
+class StageStats:
+    """Busy time of a stage, summed over its workers."""
+
+    def __init__(self, name, workers=1):
+        self.name = name
+        self.workers = workers
+        self.busy = 0.0
+        self.items = 0
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self.busy += seconds
+            self.items += 1
+
+    @contextmanager
+    def measure(self):
+        """Count the time spent in the with block as busy time of one item."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(time.perf_counter() - started)
+
+
+class Pipeline:
+    """
+    Book keeping for one run: the queues and stages to report on, the stage
+    threads, and the first error, which aborts every queue so no stage is left
+    waiting on a stage that is gone.
+    """
+
+    def __init__(self):
+        self.queues = []
+        self.stages = []
+        self.error = None
+        self._threads = []
+        self._started = time.perf_counter()
+        self._finished = None
+
+    def queue(self, name, max_bytes=DEFAULT_QUEUE_BYTES, max_items=None):
+        queue = ByteBoundedQueue(name, max_bytes, max_items)
+        self.queues.append(queue)
+        return queue
+
+    def stage(self, name, workers=1):
+        stage = StageStats(name, workers)
+        self.stages.append(stage)
+        return stage
+
+    def start_thread(self, name, target, *args):
+        """Run target on a daemon thread, any exception it raises aborts the pipeline."""
+        def run():
+            try:
+                target(*args)
+            except PipelineAborted:
+                pass
+            except BaseException as e:
+                self.abort(e)
+
+        thread = threading.Thread(target=run, name=name, daemon=True)
+        self._threads.append(thread)
+        thread.start()
+        return thread
+
+    def abort(self, error=None):
+        if error is not None and self.error is None:
+            self.error = error
+        for queue in self.queues:
+            queue.abort()
+
+    def join(self):
+        """Wait for the stage threads and stop the clock of the report."""
+        for thread in self._threads:
+            thread.join()
+        self._finished = time.perf_counter()
+
+    def report(self):
+        """Describe how busy each stage was and how full each queue ran."""
+        elapsed = (self._finished or time.perf_counter()) - self._started
+        lines = [f"Pipeline statistics ({elapsed:.1f} s):"]
+        utilization = {}
+        for stage in self.stages:
+            utilization[stage.name] = stage.busy / (elapsed * stage.workers) if elapsed > 0 else 0.0
+            workers = f" over {stage.workers} workers" if stage.workers > 1 else ""
+            lines.append(
+                f"  stage {stage.name:<8} {utilization[stage.name]:>4.0%} busy{workers}, {stage.items} item(s)"
+            )
+        for queue in self.queues:
+            lines.append(
+                f"  queue {queue.name:<16} mean {queue.mean_bytes() / _MIB:.2f} MiB, "
+                f"peak {queue.peak_bytes / _MIB:.2f} of {queue.max_bytes / _MIB:.2f} MiB, "
+                f"producer blocked {queue.put_wait:.1f} s, consumer starved {queue.get_wait:.1f} s"
+            )
+        if utilization:
+            lines.append(f"  Bottleneck: {max(utilization, key=utilization.get)}")
+        return "\n".join(lines)
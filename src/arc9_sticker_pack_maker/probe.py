@@ -0,0 +1,172 @@
+"""Read image size, mode and animation from container headers without decoding any frames."""
+
+import mmap
+import struct
+
+from PIL import Image
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# PNG color type (and bit depth where it matters) to Pillow mode.
+_PNG_MODES = {0: "L", 2: "RGB", 3: "P", 4: "LA", 6: "RGBA"}
+_PNG_GRAY_DEPTH_MODES = {1: "1", 16: "I;16"}
+
+
+def make_record(image_format, width, height, mode, frame_count):
+    """
+    Metadata record of a probed image. frame_count is None for an animation
+    whose frames were not counted, which only happens for GIFs.
+    """
+    return {
+        "format": image_format,
+        "width": width,
+        "height": height,
+        "mode": mode,
+        "frame_count": frame_count,
+        "is_animated": frame_count != 1,
+    }
+
+
+def _skip_gif_sub_blocks(data, pos):
+    while True:
+        length = data[pos]
+        pos += length + 1
+        if length == 0:
+            return pos
+
+
+def probe_gif(data, count_frames=False):
+    """
+    Walk the GIF block structure, hopping over the LZW data by its sub-block
+    lengths. Unless count_frames, the walk stops at the second frame.
+    """
+    width, height, flags = struct.unpack_from("<HHB", data, 6)
+    pos = 13
+    if flags & 0x80:
+        pos += 3 << ((flags & 7) + 1)
+    frames = 0
+    try:
+        while pos < len(data):
+            block = data[pos]
+            if block == 0x2C:
+                frames += 1
+                if frames == 2 and not count_frames:
+                    return make_record("GIF", width, height, "P", None)
+                descriptor_flags = data[pos + 9]
+                pos += 10
+                if descriptor_flags & 0x80:
+                    pos += 3 << ((descriptor_flags & 7) + 1)
+                # LZW minimum code size, then the image data.
+                pos = _skip_gif_sub_blocks(data, pos + 1)
+            elif block == 0x21:
+                pos = _skip_gif_sub_blocks(data, pos + 2)
+            elif block == 0x3B:
+                break
+            else:
+                # Pillow skips stray bytes between blocks, so frames after them still play.
+                pos += 1
+    except IndexError:
+        # Truncated file, Pillow plays the frames that are complete.
+        pass
+    if frames == 0:
+        raise ValueError("GIF without frames")
+    return make_record("GIF", width, height, "P", frames)
+
+
+def probe_png(data, count_frames=False):
+    """
+    Read IHDR and, for APNG, the frame count of the acTL chunk in front of the image
+    data. When the default image (IDAT) comes before the first fcTL it is not part
+    of the animation, but Pillow still plays it as an extra first frame.
+    """
+    width, height, bit_depth, color_type = struct.unpack_from(">IIBB", data, 16)
+    mode = _PNG_MODES[color_type]
+    if color_type == 0:
+        mode = _PNG_GRAY_DEPTH_MODES.get(bit_depth, mode)
+    frame_count = 1
+    animated = False
+    pos = 8
+    while pos + 8 <= len(data):
+        length, chunk_type = struct.unpack_from(">I4s", data, pos)
+        if chunk_type == b"acTL":
+            frame_count = struct.unpack_from(">I", data, pos + 8)[0]
+            animated = True
+        elif chunk_type == b"fcTL" or chunk_type == b"IEND":
+            break
+        elif chunk_type == b"IDAT":
+            if animated:
+                frame_count += 1
+            break
+        pos += length + 12
+    return make_record("PNG", width, height, mode, frame_count)
+
+
+def probe_webp(data, count_frames=False):
+    """Read the VP8X, VP8L or VP8 header and count ANMF chunks of animated WebPs."""
+    chunk_type = bytes(data[12:16])
+    if chunk_type == b"VP8X":
+        flags = data[20]
+        width = int.from_bytes(data[24:27], "little") + 1
+        height = int.from_bytes(data[27:30], "little") + 1
+        animated = bool(flags & 0x02)
+        mode = "RGBA" if flags & 0x10 or animated else "RGB"
+        frame_count = 1
+        if animated:
+            frame_count = 0
+            pos = 12
+            while pos + 8 <= len(data):
+                chunk_type, length = struct.unpack_from("<4sI", data, pos)
+                if chunk_type == b"ANMF":
+                    frame_count += 1
+                pos += 8 + length + (length & 1)
+        return make_record("WEBP", width, height, mode, frame_count)
+    if chunk_type == b"VP8L":
+        bits = int.from_bytes(data[21:25], "little")
+        width = (bits & 0x3FFF) + 1
+        height = ((bits >> 14) & 0x3FFF) + 1
+        mode = "RGBA" if bits >> 28 & 1 else "RGB"
+        return make_record("WEBP", width, height, mode, 1)
+    if chunk_type == b"VP8 ":
+        width, height = struct.unpack_from("<HH", data, 26)
+        return make_record("WEBP", width & 0x3FFF, height & 0x3FFF, "RGB", 1)
+    raise ValueError(f"unknown WebP chunk {chunk_type!r}")
+
+
+def _matches_webp(head):
+    return head[:4] == b"RIFF" and head[8:12] == b"WEBP"
+
+
+_CONTAINER_PROBES = (
+    (lambda head: head[:6] in (b"GIF87a", b"GIF89a"), probe_gif),
+    (lambda head: head[:8] == _PNG_SIGNATURE, probe_png),
+    (_matches_webp, probe_webp),
+)
+
+
+def probe_with_pillow(path):
+    """Fallback for other formats: Pillow reads the header, n_frames may have to seek."""
+    with Image.open(path) as img:
+        frame_count = img.n_frames if getattr(img, "is_animated", False) else 1
+        return make_record(img.format, img.width, img.height, img.mode, frame_count)
+
+
+def probe_image(path, count_frames=False):
+    """
+    Describe an image file as a record of format, width, height, mode, frame_count
+    and is_animated, or return None when it is not a readable image. GIF, PNG/APNG
+    and WebP are probed from their container structure, so the cost does not grow
+    with the number of frames (except for counting GIF frames, see probe_gif).
+    """
+    try:
+        with open(path, "rb") as f:
+            head = f.read(32)
+            for matches, probe in _CONTAINER_PROBES:
+                if matches(head):
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                        return probe(data, count_frames)
+    except (OSError, ValueError, KeyError, IndexError, struct.error):
+        # Not what the signature promised, let Pillow decide.
+        pass
+    try:
+        return probe_with_pillow(path)
+    except (OSError, SyntaxError):
+        return None
@@ -0,0 +1,141 @@
+"""Cost model and longest-first scheduler for converting a pack on a worker pool."""
+
+import ctypes
+import heapq
+import os
+import sys
+
+# Nanoseconds per source pixel and frame to decode into RGBA, by Pillow format.
+DECODE_NS_PER_PIXEL = {"GIF": 15, "PNG": 8, "JPEG": 12, "WEBP": 10}
+DEFAULT_DECODE_NS_PER_PIXEL = 15
+# Format analysis plus letterboxing, per texel and frame.
+CANVAS_NS_PER_TEXEL = 200
+# Encoding per texel and frame with the native writer, VTFLib is faster.
+ENCODE_NS_PER_TEXEL = {"dxt": 450, "lossless": 40}
+# Opening the source and writing the VMT.
+FIXED_SECONDS = 0.005
+# A mip chain adds a third to the texels of a static sticker.
+MIPMAP_FACTOR = 4 / 3
+
+
+def estimate_cost(source_format, width, height, frames, texture_width, texture_height, encoded_frames=None,
+                  texture_format="auto", streamed=False):
+    """
+    Predict the seconds and peak bytes of memory it takes to convert a sticker
+    from its probe data. frames are decoded, encoded_frames (default all of
+    them) end up in the texture. Animations hold all their letterboxed frames
+    at once, unless streamed.
+    """
+    encoded_frames = frames if encoded_frames is None else encoded_frames
+    source_pixels = width * height
+    texels = texture_width * texture_height
+    if frames == 1:
+        texels *= MIPMAP_FACTOR
+    decode_ns = DECODE_NS_PER_PIXEL.get(source_format, DEFAULT_DECODE_NS_PER_PIXEL)
+    encode_ns = ENCODE_NS_PER_TEXEL["lossless" if texture_format == "lossless" else "dxt"]
+    seconds = FIXED_SECONDS + (
+        frames * (source_pixels * decode_ns + texels * CANVAS_NS_PER_TEXEL)
+        + encoded_frames * texels * encode_ns
+    ) / 1e9
+
+    # The decoded frame and its RGBA copy, plus the RGBA canvases being encoded.
+    held_canvases = 3 if streamed or frames == 1 else encoded_frames + 2
+    peak_bytes = 2 * source_pixels * 4 + held_canvases * texels * 4
+    return {"seconds": seconds, "peak_bytes": int(peak_bytes)}
+
+
+def physical_memory():
+    """Total physical memory in bytes, or None when it cannot be determined."""
+    try:
+        if sys.platform == "win32":
+            class MemoryStatus(ctypes.Structure):
+                _fields_ = [
+                    ("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                    ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                    ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                    ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                    ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+                ]
+
+            status = MemoryStatus()
+            status.dwLength = ctypes.sizeof(MemoryStatus)
+            if not ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+                return None
+            return status.ullTotalPhys
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def default_memory_limit():
+    """Half of the physical memory, or None (no limit) when it is unknown."""
+    total = physical_memory()
+    return total // 2 if total else None
+
+
+class JobScheduler:
+    """
+    Hands out jobs longest predicted first, so the biggest stickers do not end
+    up as the long tail of a build. A job takes the number of workers in its
+    cost's "workers" (default 1) and only starts while those are free and the
+    predicted peak memory of the running jobs stays within memory_limit. When
+    the longest job does not fit, a shorter one that does is started instead,
+    and a job always starts on an idle pool.
+    """
+
+    def __init__(self, costs, workers, memory_limit=None):
+        self.costs = costs
+        self.workers = workers
+        self.memory_limit = memory_limit
+        self.pending = sorted(range(len(costs)), key=lambda index: costs[index]["seconds"], reverse=True)
+        self.running = set()
+        self.running_bytes = 0
+        self.running_workers = 0
+
+    def take(self):
+        """Return the index of a job that may start now, or None."""
+        if self.running_workers >= self.workers:
+            return None
+        for position, index in enumerate(self.pending):
+            cost = self.costs[index]
+            if self.running and (
+                self.running_workers + cost.get("workers", 1) > self.workers
+                or self.memory_limit is not None and self.running_bytes + cost["peak_bytes"] > self.memory_limit
+            ):
+                continue
+            del self.pending[position]
+            self.running.add(index)
+            self.running_bytes += cost["peak_bytes"]
+            self.running_workers += cost.get("workers", 1)
+            return index
+        return None
+
+    def finish(self, index):
+        if index in self.running:
+            self.running.remove(index)
+            self.running_bytes -= self.costs[index]["peak_bytes"]
+            self.running_workers -= self.costs[index].get("workers", 1)
+
+
+def predict_build_seconds(costs, workers, memory_limit=None):
+    """Simulate JobScheduler on the predicted costs and return when the last job finishes."""
+    scheduler = JobScheduler(costs, workers, memory_limit)
+    finishing = []
+    clock = 0.0
+    while True:
+        index = scheduler.take()
+        while index is not None:
+            heapq.heappush(finishing, (clock + costs[index]["seconds"], index))
+            index = scheduler.take()
+        if not finishing:
+            return clock
+        clock, index = heapq.heappop(finishing)
+        scheduler.finish(index)
+
+
+def format_seconds(seconds):
+    """Human readable duration, e.g. 42 s or 3 min 05 s."""
+    if seconds < 60:
+        return f"{seconds:.0f} s" if seconds >= 10 else f"{seconds:.1f} s"
+    minutes, seconds = divmod(round(seconds), 60)
+    return f"{minutes} min {seconds:02d} s"
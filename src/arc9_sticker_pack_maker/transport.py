@@ -0,0 +1,115 @@
+"""Shared-memory transport of letterboxed frames between processes."""
+
+import math
+import os
+import sys
+import threading
+from collections import OrderedDict, deque
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+# Before 3.13 every attachment is registered with the resource tracker, which
+# unlinks what is still registered when its process exits.
+_TRACKS_ATTACHMENTS = sys.version_info < (3, 13) and os.name == "posix"
+
+
+def _attach_shared_memory(name):
+    """Open an existing shared memory block without handing it to the resource tracker."""
+    if not _TRACKS_ATTACHMENTS:
+        if sys.version_info >= (3, 13):
+            return shared_memory.SharedMemory(name=name, track=False)
+        return shared_memory.SharedMemory(name=name)
+    shm = shared_memory.SharedMemory(name=name)
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+class FrameRing:
+    """
+    A ring of fixed-size uint8 frame slots in one shared memory block.
+
+    The process that creates the ring fills free slots (e.g. by letterboxing
+    straight into them) and passes only slot indices to worker processes, which
+    read the frames in place as NumPy views instead of unpickling a copy of
+    every frame. Slots are handed out and taken back by the creating process
+    only, which is not thread safe; workers just attach (see attach).
+    """
+
+    # Rings attached in this process, most recently used last.
+    _attached = OrderedDict()
+    _attached_lock = threading.Lock()
+    max_attached = 4
+
+    def __init__(self, shm, slot_count, frame_shape, owner=False):
+        self._shm = shm
+        self.slot_count = slot_count
+        self.frame_shape = tuple(frame_shape)
+        self._owner = owner
+        self._frames = np.ndarray((slot_count,) + self.frame_shape, dtype=np.uint8, buffer=shm.buf)
+        self._free = deque(range(slot_count)) if owner else None
+
+    @classmethod
+    def create(cls, slot_count, frame_shape):
+        """Allocate a ring of slot_count frames of frame_shape, e.g. (H, W, 4)."""
+        size = slot_count * math.prod(frame_shape)
+        return cls(shared_memory.SharedMemory(create=True, size=size), slot_count, frame_shape, owner=True)
+
+    @classmethod
+    def attach(cls, name, slot_count, frame_shape):
+        """
+        Return the ring with this descriptor in the current process, attaching on
+        first use. The few most recently used rings stay attached, so a worker
+        maps each ring once instead of once per frame.
+        """
+        with cls._attached_lock:
+            ring = cls._attached.get(name)
+            if ring is not None:
+                cls._attached.move_to_end(name)
+                return ring
+            ring = cls(_attach_shared_memory(name), slot_count, frame_shape)
+            cls._attached[name] = ring
+            while len(cls._attached) > cls.max_attached:
+                _, stale = cls._attached.popitem(last=False)
+                stale.close()
+            return ring
+
+    @property
+    def descriptor(self):
+        """What a worker needs to attach: (name, slot_count, frame_shape)."""
+        return self._shm.name, self.slot_count, self.frame_shape
+
+    def frame(self, slot):
+        """The frame in a slot as a writable NumPy view into the shared memory."""
+        return self._frames[slot]
+
+    def acquire(self):
+        """Return a free slot, or None when every slot is in use."""
+        return self._free.popleft() if self._free else None
+
+    def release(self, slot):
+        """Give a slot back once the worker reading it is done."""
+        self._free.append(slot)
+
+    def close(self):
+        """Unmap the ring, the creating process also frees the shared memory."""
+        if self._frames is None:
+            return
+        self._frames = None
+        try:
+            self._shm.close()
+        except BufferError:
+            # A view is still referenced (e.g. by a traceback), the mapping goes with it.
+            pass
+        if self._owner:
+            if _TRACKS_ATTACHMENTS:
+                # A worker sharing this process's tracker dropped the registration
+                # when it attached, unlink expects to find it.
+                resource_tracker.register(self._shm._name, "shared_memory")
+            self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,224 @@
+"""Pure Python/NumPy VTF 7.2 writer used when VTFLib is not available."""
+
+import struct
+from contextlib import contextmanager
+from itertools import chain
+
+import numpy as np
+
+from vtflib.enums import ImageFormat
+
+from arc9_sticker_pack_maker import dxt
+
+VTF_SIGNATURE = b"VTF\0"
+VTF_VERSION = (7, 2)
+VTF_HEADER_SIZE = 80
+# No low resolution thumbnail is written, VTF marks that with format -1.
+NO_IMAGE_FORMAT = 0xFFFFFFFF
+
+# signature, version[2], header size, width, height, flags, frames, first frame,
+# padding, reflectivity[3], padding, bumpmap scale, high res format, mipmap count,
+# low res format, low res width, low res height, depth (7.2+)
+_HEADER_STRUCT = struct.Struct("<4s2IIHHIHH4x3f4xfIBIBBH")
+
+# Bytes per pixel for the uncompressed formats the native writer can emit.
+UNCOMPRESSED_FORMATS = {
+    ImageFormat.ImageFormatRGBA8888: 4,
+    ImageFormat.ImageFormatRGB888: 3,
+    ImageFormat.ImageFormatIA88: 2,
+    ImageFormat.ImageFormatI8: 1,
+}
+# Bytes per 4x4 block for the block compressed formats, with their encoders.
+BLOCK_FORMATS = {
+    ImageFormat.ImageFormatDXT1: dxt.DXT1_BLOCK_BYTES,
+    ImageFormat.ImageFormatDXT1OneBitAlpha: dxt.DXT1_BLOCK_BYTES,
+    ImageFormat.ImageFormatDXT5: dxt.DXT5_BLOCK_BYTES,
+}
+BLOCK_ENCODERS = {
+    ImageFormat.ImageFormatDXT1: dxt.compress_dxt1,
+    ImageFormat.ImageFormatDXT1OneBitAlpha: dxt.compress_dxt1_one_bit_alpha,
+    ImageFormat.ImageFormatDXT5: dxt.compress_dxt5,
+}
+# Rec. 601 luma weights, used for the I8/IA88 intensity channel.
+_LUMA_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def is_power_of_two(value):
+    return value > 0 and value & (value - 1) == 0
+
+
+def mipmap_count(width, height):
+    """Number of mip levels in a full chain down to 1x1."""
+    return max(width, height).bit_length()
+
+
+def mipmap_dimensions(width, height, level):
+    return max(1, width >> level), max(1, height >> level)
+
+
+def compute_image_size(width, height, image_format):
+    """Size in bytes of one surface of the given format."""
+    if image_format in UNCOMPRESSED_FORMATS:
+        return width * height * UNCOMPRESSED_FORMATS[image_format]
+    if image_format in BLOCK_FORMATS:
+        return ((width + 3) // 4) * ((height + 3) // 4) * BLOCK_FORMATS[image_format]
+    raise ValueError(f"Image format {image_format} is not supported by the native VTF writer.")
+
+
+def generate_mipmaps(rgba):
+    """Return the mip chain of an (H, W, 4) uint8 array, largest first, using a box filter."""
+    levels = [rgba]
+    current = rgba.astype(np.float32)
+    while current.shape[0] > 1 or current.shape[1] > 1:
+        height, width = current.shape[:2]
+        if height > 1:
+            current = (current[0::2] + current[1::2]) * 0.5
+        if width > 1:
+            current = (current[:, 0::2] + current[:, 1::2]) * 0.5
+        levels.append(np.rint(current).astype(np.uint8))
+    return levels
+
+
+def encode_surfaces(rgba, image_format):
+    """
+    Encode (H, W, 4) or (N, H, W, 4) uint8 RGBA pixels into raw VTF surface data.
+    Batches are encoded in one call, returning one bytes-like row per frame.
+    """
+    rgba = np.asarray(rgba, dtype=np.uint8)
+    if image_format in BLOCK_ENCODERS:
+        return BLOCK_ENCODERS[image_format](rgba)
+    if image_format == ImageFormat.ImageFormatRGBA8888:
+        pixels = rgba
+    elif image_format == ImageFormat.ImageFormatRGB888:
+        pixels = rgba[..., :3]
+    elif image_format in (ImageFormat.ImageFormatI8, ImageFormat.ImageFormatIA88):
+        luma = np.rint(rgba[..., :3] @ _LUMA_WEIGHTS).astype(np.uint8)
+        if image_format == ImageFormat.ImageFormatI8:
+            pixels = luma
+        else:
+            pixels = np.stack([luma, rgba[..., 3]], axis=-1)
+    else:
+        raise ValueError(f"Image format {image_format} is not supported by the native VTF writer.")
+    frame_shape = rgba.shape[:-3]
+    return np.ascontiguousarray(pixels).reshape(*frame_shape, -1)
+
+
+def compute_reflectivity(rgba):
+    """Average linear colour of the texture, stored in the header like vtex does."""
+    linear = (rgba[..., :3].astype(np.float32) / 255.0) ** 2.2
+    return tuple(float(value) for value in linear.reshape(-1, 3).mean(axis=0))
+
+
+def build_header(width, height, image_format, flags, frames, mipmaps, reflectivity, start_frame=0):
+    header = _HEADER_STRUCT.pack(
+        VTF_SIGNATURE,
+        VTF_VERSION[0], VTF_VERSION[1],
+        VTF_HEADER_SIZE,
+        width, height,
+        int(flags),
+        frames, start_frame,
+        *reflectivity,
+        1.0,
+        int(image_format),
+        mipmaps,
+        NO_IMAGE_FORMAT,
+        0, 0,
+        1,
+    )
+    return header.ljust(VTF_HEADER_SIZE, b"\0")
+
+
+@contextmanager
+def open_output(target):
+    """Open a path for writing, or use an already open binary file object as is."""
+    if hasattr(target, "write"):
+        yield target
+    else:
+        with open(target, "wb") as f:
+            yield f
+
+
+def write_vtf(path, frames, image_format=ImageFormat.ImageFormatRGBA8888, flags=0, mipmaps=True):
+    """
+    Write a VTF 7.2 file (path or binary file object) from a sequence of
+    (H, W, 4) uint8 RGBA arrays. All frames must share the same power-of-two
+    size. Mipmaps are generated with a box filter when requested, like
+    VTFLib's default create options.
+    """
+    frames = [np.asarray(frame, dtype=np.uint8) for frame in frames]
+    if not frames:
+        raise ValueError("Cannot write a VTF without frames.")
+    height, width = frames[0].shape[:2]
+    if not (is_power_of_two(width) and is_power_of_two(height)):
+        raise ValueError(f"VTF dimensions must be powers of two, got {width}x{height}.")
+    if any(frame.shape != frames[0].shape for frame in frames):
+        raise ValueError("All VTF frames must have the same dimensions.")
+
+    if mipmaps:
+        chains = [generate_mipmaps(frame) for frame in frames]
+    else:
+        chains = [[frame] for frame in frames]
+    level_count = len(chains[0])
+
+    header = build_header(
+        width, height, image_format, flags, len(frames), level_count, compute_reflectivity(frames[0])
+    )
+    with open_output(path) as f:
+        f.write(header)
+        # High resolution data is stored smallest mip first, then frame by frame.
+        for level in reversed(range(level_count)):
+            surfaces = encode_surfaces(np.stack([chain[level] for chain in chains]), image_format)
+            f.write(np.ascontiguousarray(surfaces).tobytes())
+
+
+def write_vtf_surfaces(path, surfaces, width, height, image_format=ImageFormat.ImageFormatRGBA8888, flags=0,
+                       reflectivity=(0.0, 0.0, 0.0)):
+    """
+    Write a VTF 7.2 file (path or binary file object) without mipmaps from a
+    sequence of frame surfaces already encoded with encode_surfaces, e.g. by
+    several workers. reflectivity is compute_reflectivity of the first frame.
+    """
+    if not (is_power_of_two(width) and is_power_of_two(height)):
+        raise ValueError(f"VTF dimensions must be powers of two, got {width}x{height}.")
+    if not surfaces:
+        raise ValueError("Cannot write a VTF without frames.")
+    surface_size = compute_image_size(width, height, image_format)
+    header = build_header(width, height, image_format, flags, len(surfaces), 1, reflectivity)
+    with open_output(path) as f:
+        f.write(header)
+        for surface in surfaces:
+            data = np.ascontiguousarray(surface).tobytes()
+            if len(data) != surface_size:
+                raise ValueError(f"Expected {surface_size} bytes per frame, got {len(data)}.")
+            f.write(data)
+
+
+def write_vtf_stream(path, frames, frame_count, image_format=ImageFormat.ImageFormatRGBA8888, flags=0):
+    """
+    Write a VTF 7.2 file (path or binary file object) without mipmaps one frame
+    at a time from an iterable of (H, W, 4) uint8 RGBA arrays, so only one
+    decoded frame is held at once. frame_count must match the number of frames
+    the iterable yields.
+    """
+    frames = iter(frames)
+    first = next(frames, None)
+    if first is None:
+        raise ValueError("Cannot write a VTF without frames.")
+    first = np.asarray(first, dtype=np.uint8)
+    height, width = first.shape[:2]
+    if not (is_power_of_two(width) and is_power_of_two(height)):
+        raise ValueError(f"VTF dimensions must be powers of two, got {width}x{height}.")
+
+    header = build_header(width, height, image_format, flags, frame_count, 1, compute_reflectivity(first))
+    written = 0
+    with open_output(path) as f:
+        f.write(header)
+        # Without mipmaps the high resolution data is just every frame in order.
+        for frame in chain([first], frames):
+            frame = np.asarray(frame, dtype=np.uint8)
+            if frame.shape != first.shape:
+                raise ValueError("All VTF frames must have the same dimensions.")
+            f.write(np.ascontiguousarray(encode_surfaces(frame, image_format)).tobytes())
+            written += 1
+    if written != frame_count:
+        raise ValueError(f"Expected {frame_count} frames for the VTF, got {written}.")
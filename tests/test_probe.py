@@ -0,0 +1,110 @@
+"""
+Checks that header probing counts the frames Pillow plays, and that conversion survives a wrong count.
+
+Usage: python tests/test_probe.py (or python -m pytest tests)
+
+The frame count from probe.probe_image sizes the frame array of an animation
+before any frame is decoded, so every sample is compared against Pillow's own
+n_frames and then converted.
+"""
+
+import io
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = PROJECT_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from arc9_sticker_pack_maker import core, probe
+from arc9_sticker_pack_maker.core import Image, np
+
+
+def frames(count, size=(20, 10)):
+    return [Image.new("RGBA", size, (index * 60, 255 - index * 60, 0, 255)) for index in range(count)]
+
+
+def save_apng(path, default_image):
+    """A 4 frame APNG. With default_image the IDAT image is not part of the animation."""
+    first, *rest = frames(4)
+    first.save(path, save_all=True, append_images=rest, default_image=default_image, duration=100)
+
+
+def gif_with_stray_byte(path):
+    """A 3 frame GIF with a byte between two blocks, which Pillow skips."""
+    first, *rest = [frame.convert("RGB") for frame in frames(3, (8, 8))]
+    buffer = io.BytesIO()
+    first.save(buffer, "GIF", save_all=True, append_images=rest, duration=[100, 200, 300])
+    data = buffer.getvalue()
+
+    # Walk the blocks to the one after the first image.
+    pos = 13 + (3 << ((data[10] & 7) + 1) if data[10] & 0x80 else 0)
+    seen_image = False
+    while data[pos] != 0x3B and not (seen_image and data[pos] in (0x21, 0x2C)):
+        if data[pos] == 0x2C:
+            seen_image = True
+            flags = data[pos + 9]
+            pos += 10 + (3 << ((flags & 7) + 1) if flags & 0x80 else 0) + 1
+        else:
+            pos += 2
+        while data[pos]:
+            pos += data[pos] + 1
+        pos += 1
+    with open(path, "wb") as f:
+        f.write(data[:pos] + b"\x07" + data[pos:])
+
+
+def convert(path, folder):
+    info = core.discover_images(folder, use_index=False)[0]
+    assert info["path"] == path
+    result = core.process_image_to_vtf(
+        folder, info, "test", "sticker", folder, {"backend": "native", "texture_format": "lossless"}
+    )
+    assert result, path
+    with open(os.path.join(folder, "sticker.vtf"), "rb") as f:
+        return int.from_bytes(f.read()[24:26], "little")
+
+
+def check_sample(make, name, count_frames=False):
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, name)
+        make(path)
+        with Image.open(path) as img:
+            expected = img.n_frames
+        assert probe.probe_image(path, count_frames=count_frames)["frame_count"] == expected
+        assert convert(path, folder) == expected
+
+
+def test_apng_with_default_image():
+    check_sample(lambda path: save_apng(path, default_image=True), "default.png")
+
+
+def test_apng():
+    check_sample(lambda path: save_apng(path, default_image=False), "plain.png")
+
+
+def test_gif_with_stray_byte():
+    check_sample(gif_with_stray_byte, "stray.gif", count_frames=True)
+
+
+def test_load_animated_frames_outgrows_the_hint():
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "default.png")
+        save_apng(path, default_image=True)
+        with Image.open(path) as img:
+            pixels, durations = core.load_animated_frames(img, frame_count=1)
+        assert pixels.shape[0] == len(durations) == 4
+        # The last frame made it into the array, not just its duration.
+        height, width = pixels.shape[1:3]
+        assert np.array_equal(pixels[3, height // 2, width // 2], [180, 75, 0, 255])
+
+
+if __name__ == "__main__":
+    tests = [(name, test) for name, test in sorted(globals().items()) if name.startswith("test_")]
+    for name, test in tests:
+        test()
+        print(f"ok   {name}")
+    print(f"{len(tests)} checks passed")
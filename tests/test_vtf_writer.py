@@ -0,0 +1,139 @@
+"""
+Checks for the native VTF writer.
+
+Usage: python tests/test_vtf_writer.py (or python -m pytest tests)
+
+The VTF header is decoded at the field offsets of the VTF 7.2 layout rather
+than through vtf_writer's own struct, and every surface is located at the
+offset the smallest-mip-first, frame-by-frame layout puts it.
+"""
+
+import io
+import struct
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = PROJECT_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+# core puts the bundled VTFLib wrapper that vtf_writer needs on the path.
+from arc9_sticker_pack_maker import core, vtf_writer  # noqa: F401
+from arc9_sticker_pack_maker.core import ImageFormat, np
+
+
+def gradient(height, width, seed=0):
+    """Noisy RGBA gradient with a fixed slope, so any size is equally hard to compress."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    pixels = np.stack([40 + x * 3, 60 + y * 3, 200 - (x + y) * 2, 255 - x * 4], axis=-1)
+    pixels += rng.normal(0, 3, pixels.shape)
+    return np.clip(np.rint(pixels), 0, 255).astype(np.uint8)
+
+
+def read_header(data):
+    """Decode the VTF 7.2 header fields at their offsets in the file."""
+    return {
+        "signature": data[0:4],
+        "version": struct.unpack_from("<2I", data, 4),
+        "header_size": struct.unpack_from("<I", data, 12)[0],
+        "width": struct.unpack_from("<H", data, 16)[0],
+        "height": struct.unpack_from("<H", data, 18)[0],
+        "flags": struct.unpack_from("<I", data, 20)[0],
+        "frames": struct.unpack_from("<H", data, 24)[0],
+        "first_frame": struct.unpack_from("<H", data, 26)[0],
+        "reflectivity": struct.unpack_from("<3f", data, 32),
+        "bumpmap_scale": struct.unpack_from("<f", data, 48)[0],
+        "format": struct.unpack_from("<I", data, 52)[0],
+        "mipmaps": data[56],
+        "low_res_format": struct.unpack_from("<I", data, 57)[0],
+        "low_res_size": (data[61], data[62]),
+        "depth": struct.unpack_from("<H", data, 63)[0],
+    }
+
+
+def write_to_bytes(frames, image_format, **options):
+    buffer = io.BytesIO()
+    vtf_writer.write_vtf(buffer, frames, image_format, **options)
+    return buffer.getvalue()
+
+
+def test_header_fields():
+    frames = [gradient(8, 16, seed) for seed in range(3)]
+    data = write_to_bytes(frames, ImageFormat.ImageFormatDXT5, flags=0x2000)
+    header = read_header(data)
+    assert header["signature"] == b"VTF\0"
+    assert header["version"] == (7, 2)
+    assert header["header_size"] == 80
+    assert (header["width"], header["height"]) == (16, 8)
+    assert header["flags"] == 0x2000
+    assert (header["frames"], header["first_frame"]) == (3, 0)
+    assert np.allclose(header["reflectivity"], vtf_writer.compute_reflectivity(frames[0]))
+    assert header["bumpmap_scale"] == 1.0
+    assert header["format"] == int(ImageFormat.ImageFormatDXT5)
+    # 16x8 down to 1x1 is 5 levels.
+    assert header["mipmaps"] == 5
+    assert header["low_res_format"] == 0xFFFFFFFF
+    assert header["low_res_size"] == (0, 0)
+    assert header["depth"] == 1
+    assert data[65:80] == bytes(15)
+
+
+def test_surfaces_are_stored_smallest_mip_first():
+    for image_format in (ImageFormat.ImageFormatRGBA8888, ImageFormat.ImageFormatDXT1):
+        frames = [gradient(8, 16, seed) for seed in range(2)]
+        data = write_to_bytes(frames, image_format)
+        chains = [vtf_writer.generate_mipmaps(frame) for frame in frames]
+        offset = 80
+        for level in reversed(range(len(chains[0]))):
+            width, height = vtf_writer.mipmap_dimensions(16, 8, level)
+            size = vtf_writer.compute_image_size(width, height, image_format)
+            for chain in chains:
+                expected = np.ascontiguousarray(vtf_writer.encode_surfaces(chain[level], image_format)).tobytes()
+                assert len(expected) == size
+                assert data[offset:offset + size] == expected, (image_format, level)
+                offset += size
+        assert offset == len(data)
+
+
+def test_single_level_writers_match_write_vtf():
+    frames = [gradient(16, 16, seed) for seed in range(3)]
+    image_format = ImageFormat.ImageFormatDXT5
+    expected = write_to_bytes(frames, image_format, mipmaps=False)
+
+    streamed = io.BytesIO()
+    vtf_writer.write_vtf_stream(streamed, iter(frames), len(frames), image_format)
+    assert streamed.getvalue() == expected
+
+    from_surfaces = io.BytesIO()
+    surfaces = [vtf_writer.encode_surfaces(frame, image_format) for frame in frames]
+    vtf_writer.write_vtf_surfaces(
+        from_surfaces, surfaces, 16, 16, image_format, reflectivity=vtf_writer.compute_reflectivity(frames[0])
+    )
+    assert from_surfaces.getvalue() == expected
+
+
+def test_intensity_formats():
+    pixels = np.array([[[255, 255, 255, 255], [255, 0, 0, 128]],
+                       [[0, 255, 0, 0], [0, 0, 255, 64]]], dtype=np.uint8)
+    luma = [[255, 76], [150, 29]]
+    i8 = vtf_writer.encode_surfaces(pixels, ImageFormat.ImageFormatI8)
+    assert i8.tolist() == [value for row in luma for value in row]
+    ia88 = vtf_writer.encode_surfaces(pixels, ImageFormat.ImageFormatIA88)
+    assert ia88.tolist() == [255, 255, 76, 128, 150, 0, 29, 64]
+
+    for image_format, texel_bytes in ((ImageFormat.ImageFormatI8, 1), (ImageFormat.ImageFormatIA88, 2)):
+        data = write_to_bytes([pixels], image_format)
+        assert read_header(data)["format"] == int(image_format)
+        # 1x1 and 2x2 levels, the full size one last.
+        assert len(data) == 80 + (1 + 4) * texel_bytes
+        assert data[80 + texel_bytes:] == vtf_writer.encode_surfaces(pixels, image_format).tobytes()
+
+
+if __name__ == "__main__":
+    tests = [(name, test) for name, test in sorted(globals().items()) if name.startswith("test_")]
+    for name, test in tests:
+        test()
+        print(f"ok   {name}")
+    print(f"{len(tests)} checks passed")